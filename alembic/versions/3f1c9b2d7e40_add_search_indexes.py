@@ -0,0 +1,92 @@
+"""Add full-text and trigram search indexes
+
+Revision ID: 3f1c9b2d7e40
+Revises: 8a7ad56b6773
+Create Date: 2026-10-18 10:12:41.530412
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "3f1c9b2d7e40"
+down_revision: Union[str, Sequence[str], None] = "8a7ad56b6773"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    op.add_column(
+        "books",
+        sa.Column(
+            "search_vector",
+            postgresql.TSVECTOR(),
+            sa.Computed("to_tsvector('simple', title)", persisted=True),
+            nullable=True,
+        ),
+    )
+    op.add_column(
+        "authors",
+        sa.Column(
+            "search_vector",
+            postgresql.TSVECTOR(),
+            sa.Computed(
+                "to_tsvector('simple', first_name || ' ' || last_name)",
+                persisted=True,
+            ),
+            nullable=True,
+        ),
+    )
+
+    op.create_index(
+        "ix_books_search_vector",
+        "books",
+        ["search_vector"],
+        postgresql_using="gin",
+    )
+    op.create_index(
+        "ix_authors_search_vector",
+        "authors",
+        ["search_vector"],
+        postgresql_using="gin",
+    )
+    op.create_index(
+        "ix_books_title_trgm",
+        "books",
+        ["title"],
+        postgresql_using="gin",
+        postgresql_ops={"title": "gin_trgm_ops"},
+    )
+    op.create_index(
+        "ix_authors_first_name_trgm",
+        "authors",
+        ["first_name"],
+        postgresql_using="gin",
+        postgresql_ops={"first_name": "gin_trgm_ops"},
+    )
+    op.create_index(
+        "ix_authors_last_name_trgm",
+        "authors",
+        ["last_name"],
+        postgresql_using="gin",
+        postgresql_ops={"last_name": "gin_trgm_ops"},
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_authors_last_name_trgm", table_name="authors")
+    op.drop_index("ix_authors_first_name_trgm", table_name="authors")
+    op.drop_index("ix_books_title_trgm", table_name="books")
+    op.drop_index("ix_authors_search_vector", table_name="authors")
+    op.drop_index("ix_books_search_vector", table_name="books")
+    op.drop_column("authors", "search_vector")
+    op.drop_column("books", "search_vector")
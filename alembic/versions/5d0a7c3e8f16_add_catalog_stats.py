@@ -0,0 +1,50 @@
+"""Add catalog stats summary table
+
+Revision ID: 5d0a7c3e8f16
+Revises: b7e2d4a91c05
+Create Date: 2026-10-18 12:27:05.604931
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "5d0a7c3e8f16"
+down_revision: Union[str, Sequence[str], None] = "b7e2d4a91c05"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "catalog_stats",
+        sa.Column("id", sa.BigInteger(), nullable=False),
+        sa.Column("metric", sa.String(length=32), nullable=False),
+        sa.Column("key", sa.Integer(), nullable=False),
+        sa.Column("total", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("metric", "key", name="uq_catalog_stats_metric_key"),
+    )
+    # Backfill once; from here on the service write paths keep it current
+    op.execute(
+        "INSERT INTO catalog_stats (metric, key, total) "
+        "SELECT 'books_per_author', author_id, count(*) FROM books GROUP BY author_id"
+    )
+    op.execute(
+        "INSERT INTO catalog_stats (metric, key, total) "
+        "SELECT 'books_per_year', year, count(*) FROM books GROUP BY year"
+    )
+    op.execute(
+        "INSERT INTO catalog_stats (metric, key, total) "
+        "SELECT 'authors_per_age', age, count(*) FROM authors GROUP BY age"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("catalog_stats")
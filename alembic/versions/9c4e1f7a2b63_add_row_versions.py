@@ -0,0 +1,34 @@
+"""Add row version columns to authors and books
+
+Revision ID: 9c4e1f7a2b63
+Revises: 5d0a7c3e8f16
+Create Date: 2026-10-18 14:05:41.218306
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "9c4e1f7a2b63"
+down_revision: Union[str, Sequence[str], None] = "5d0a7c3e8f16"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # A constant default is stored in the catalog, existing rows are not rewritten
+    for table in ("authors", "books"):
+        op.add_column(
+            table,
+            sa.Column("version", sa.Integer(), server_default="1", nullable=False),
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in ("books", "authors"):
+        op.drop_column(table, "version")
@@ -0,0 +1,36 @@
+"""Add indexes for list filters and sorting
+
+Revision ID: b7e2d4a91c05
+Revises: 3f1c9b2d7e40
+Create Date: 2026-10-18 11:03:27.118204
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b7e2d4a91c05"
+down_revision: Union[str, Sequence[str], None] = "3f1c9b2d7e40"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Leading author_id also covers the foreign key, so ON DELETE CASCADE
+    # and ?author_id= no longer scan books
+    op.create_index("ix_books_author_id_year", "books", ["author_id", "year"])
+    op.create_index("ix_books_year_id", "books", ["year", "id"])
+    op.create_index("ix_authors_last_name_id", "authors", ["last_name", "id"])
+    op.create_index("ix_authors_age_id", "authors", ["age", "id"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_authors_age_id", table_name="authors")
+    op.drop_index("ix_authors_last_name_id", table_name="authors")
+    op.drop_index("ix_books_year_id", table_name="books")
+    op.drop_index("ix_books_author_id_year", table_name="books")
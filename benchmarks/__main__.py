@@ -0,0 +1,96 @@
+"""Seed a database and measure the API.
+
+    python -m benchmarks seed --books 100000
+    python -m benchmarks run --target asgi --mix cold warm write
+    python -m benchmarks compare benchmarks/results/a.json benchmarks/results/b.json
+    python -m benchmarks coders
+
+The app and the seeder use the DB_* settings, so point DB_NAME at a scratch
+database: seeding drops and recreates every table.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+from pathlib import Path
+
+from src.core.db import db_helper
+from . import coders, runner
+from .seed import seed
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    seed_cmd = commands.add_parser("seed", help="recreate and fill the database")
+    seed_cmd.add_argument("--books", type=int, default=10_000)
+    seed_cmd.add_argument("--books-per-author", type=int, default=10)
+
+    run_cmd = commands.add_parser("run", help="measure the seeded database")
+    run_cmd.add_argument("--target", choices=runner.TARGETS, default="asgi")
+    run_cmd.add_argument(
+        "--mix", nargs="+", choices=runner.MIXES, default=["cold", "warm", "write"]
+    )
+    run_cmd.add_argument("--requests", type=int, default=200, help="per route")
+    run_cmd.add_argument("--concurrency", type=int, default=16)
+    run_cmd.add_argument("--seed", type=int, default=0)
+    run_cmd.add_argument(
+        "--redis",
+        action="store_true",
+        help="run the asgi target with its lifespan and the Redis cache",
+    )
+    run_cmd.add_argument("--port", type=int, default=8765)
+    run_cmd.add_argument("--workers", type=int, default=1)
+    run_cmd.add_argument("--output", type=Path)
+    run_cmd.add_argument(
+        "--app-log-level",
+        default="WARNING",
+        help="level of the app's own loggers while measuring in process",
+    )
+
+    compare_cmd = commands.add_parser("compare", help="diff two result files")
+    compare_cmd.add_argument("old", type=Path)
+    compare_cmd.add_argument("new", type=Path)
+
+    coders_cmd = commands.add_parser(
+        "coders", help="size and speed of the cache coders"
+    )
+    coders_cmd.add_argument("--repeat", type=int, default=1000)
+    return parser.parse_args()
+
+
+async def main(args: argparse.Namespace) -> None:
+    if args.command == "seed":
+        await seed(db_helper.engine, args.books, args.books_per_author)
+        await db_helper.dispose()
+        return
+
+    if args.command == "compare":
+        old, new = (json.loads(x.read_text()) for x in (args.old, args.new))
+        print(runner.compare(old, new))
+        return
+
+    if args.command == "coders":
+        print(coders.format_report(await coders.run(args.repeat)))
+        await db_helper.dispose()
+        return
+
+    logging.getLogger("src").setLevel(args.app_log_level)
+    report = await runner.run(
+        target=args.target,
+        mixes=args.mix,
+        requests=args.requests,
+        concurrency=args.concurrency,
+        seed=args.seed,
+        use_redis=args.redis,
+        port=args.port,
+        workers=args.workers,
+    )
+    print(runner.format_report(report))
+    print(f"Saved to {runner.save(report, args.output)}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,95 @@
+"""Size and speed of the cache coders on bodies of the seeded database."""
+
+import time
+from typing import Any
+
+import orjson
+from fastapi_cache import Coder
+
+from src.core.cache import make_coder
+from src.core.config import CacheCoderConfig
+from src.core.responses import JSONBytesResponse
+from .runner import in_process
+from .scenarios import Call
+
+BODIES = [
+    ("GET /books/{book_id}", Call("GET", "/books/1")),
+    ("GET /books/?limit=50", Call("GET", "/books/", {"limit": 50})),
+    ("GET /books/?limit=500", Call("GET", "/books/", {"limit": 500})),
+    (
+        "GET /authors/?include=books",
+        Call("GET", "/authors/", {"limit": 50, "include": "books"}),
+    ),
+]
+
+# The first one is what the others are compared against
+CODERS = {
+    "orjson": CacheCoderConfig(),
+    "orjson+zstd": CacheCoderConfig(zstd={"enabled": True, "minimum_size": 0}),
+    "msgpack": CacheCoderConfig(format="msgpack"),
+    "msgpack+zstd": CacheCoderConfig(
+        format="msgpack", zstd={"enabled": True, "minimum_size": 0}
+    ),
+}
+
+
+async def fetch_bodies() -> dict[str, bytes]:
+    bodies = {}
+    async with in_process(use_redis=False) as client:
+        for name, call in BODIES:
+            response = await client.request(
+                call.method,
+                call.url,
+                params=call.params,
+                headers={"Cache-Control": "no-store", "Accept-Encoding": "identity"},
+            )
+            response.raise_for_status()
+            bodies[name] = response.content
+    return bodies
+
+
+def per_call(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def measure(coder: type[Coder], body: bytes, repeat: int) -> dict[str, Any]:
+    """Encoding runs on every miss, ``decode_as_type`` on every hit."""
+    response = JSONBytesResponse(body)
+    stored = coder.encode(response)
+    decoded = coder.decode_as_type(stored, type_=None).body
+    assert orjson.loads(decoded) == orjson.loads(body)
+    return {
+        "bytes": len(stored),
+        "encode_us": round(per_call(lambda: coder.encode(response), repeat) * 1e6, 1),
+        "decode_us": round(
+            per_call(lambda: coder.decode_as_type(stored, type_=None), repeat) * 1e6, 1
+        ),
+    }
+
+
+async def run(repeat: int) -> list[dict[str, Any]]:
+    bodies = await fetch_bodies()
+    coders = {name: make_coder(config) for name, config in CODERS.items()}
+    return [
+        {"body": body_name, "coder": name, **measure(coder, body, repeat)}
+        for body_name, body in bodies.items()
+        for name, coder in coders.items()
+    ]
+
+
+def format_report(results: list[dict[str, Any]]) -> str:
+    lines = [
+        f"{'body':<30}{'coder':<14}{'bytes':>10}{'size':>8}"
+        f"{'encode us':>12}{'decode us':>12}"
+    ]
+    baseline = {}
+    for x in results:
+        base = baseline.setdefault(x["body"], x["bytes"])
+        lines.append(
+            f"{x['body']:<30}{x['coder']:<14}{x['bytes']:>10}"
+            f"{x['bytes'] / base:>8.0%}{x['encode_us']:>12.1f}{x['decode_us']:>12.1f}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,385 @@
+import asyncio
+import json
+import logging
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from contextlib import AsyncExitStack, asynccontextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Iterable
+
+import httpx
+from fastapi_cache import FastAPICache
+from fastapi_cache.backends.inmemory import InMemoryBackend
+from redis.asyncio import Redis
+
+from src.core.cache import make_coder
+from src.core.config import settings
+from src.core.db import db_helper
+from src.main import app
+from .scenarios import EXPORT_ROUTES, READ_ROUTES, WARM_KEYS, Call, Route, WriteMix
+from .seed import Dataset, has_trigram, load_dataset
+
+logger = logging.getLogger(__name__)
+
+MIXES = ("cold", "warm", "write", "export")
+TARGETS = ("asgi", "uvicorn")
+RESULTS_DIR = Path(__file__).parent / "results"
+# Full-table exports are slow on big datasets, a few samples are enough
+EXPORT_REQUESTS = 5
+# The write mix spreads its requests over many routes
+WRITE_MIX_FACTOR = 10
+
+
+@dataclass
+class Samples:
+    latencies: list[float] = field(default_factory=list)
+    errors: int = 0
+    elapsed: float = 0.0
+
+    def summary(self) -> dict[str, Any]:
+        latencies = sorted(self.latencies)
+        if len(latencies) > 1:
+            cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+            p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+        else:
+            p50 = p95 = p99 = latencies[0] if latencies else 0.0
+        return {
+            "requests": len(latencies),
+            "errors": self.errors,
+            "p50_ms": round(p50 * 1000, 3),
+            "p95_ms": round(p95 * 1000, 3),
+            "p99_ms": round(p99 * 1000, 3),
+            "mean_ms": round(statistics.fmean(latencies) * 1000, 3) if latencies else 0,
+            "rps": round(len(latencies) / self.elapsed, 1) if self.elapsed else 0,
+        }
+
+
+async def drive(
+    client: httpx.AsyncClient,
+    calls: Iterable[tuple[str, Call]],
+    concurrency: int,
+    on_response: Callable[[str, httpx.Response], None] | None = None,
+) -> dict[str, Samples]:
+    """Send ``calls`` from ``concurrency`` workers sharing one iterator.
+
+    Throughput of a route is its request count over the wall time of the
+    whole batch, so for mixed batches the rates add up to the total.
+    """
+    samples: dict[str, Samples] = defaultdict(Samples)
+    calls = iter(calls)
+
+    async def worker() -> None:
+        for name, call in calls:
+            start = time.perf_counter()
+            try:
+                response = await client.request(
+                    call.method, call.url, params=call.params, json=call.json
+                )
+            except httpx.HTTPError:
+                samples[name].errors += 1
+                continue
+            samples[name].latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                samples[name].errors += 1
+            if on_response is not None:
+                on_response(name, response)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    for x in samples.values():
+        x.elapsed = elapsed
+    return samples
+
+
+async def run_cold(
+    client: httpx.AsyncClient,
+    dataset: Dataset,
+    requests: int,
+    concurrency: int,
+    rng: random.Random,
+) -> dict[str, Samples]:
+    """Every request uses a cache key no earlier request of the run used."""
+    results = {}
+    for route in READ_ROUTES:
+        keys = route.keys(dataset)
+        if keys < 2:
+            logger.info("%s has no parameters to vary, skipped when cold", route.name)
+            continue
+        sample = rng.sample(range(keys), min(requests, keys))
+        calls = ((route.name, route.call(dataset, k)) for k in sample)
+        results.update(await drive(client, calls, concurrency))
+    return results
+
+
+async def run_warm(
+    client: httpx.AsyncClient,
+    dataset: Dataset,
+    requests: int,
+    concurrency: int,
+    rng: random.Random,
+) -> dict[str, Samples]:
+    results = {}
+    for route in READ_ROUTES:
+        keys = range(min(WARM_KEYS, route.keys(dataset)))
+        for k in keys:
+            call = route.call(dataset, k)
+            await client.request(call.method, call.url, params=call.params)
+        calls = (
+            (route.name, route.call(dataset, rng.choice(keys))) for _ in range(requests)
+        )
+        results.update(await drive(client, calls, concurrency))
+    return results
+
+
+async def run_write(
+    client: httpx.AsyncClient,
+    dataset: Dataset,
+    requests: int,
+    concurrency: int,
+    rng: random.Random,
+) -> dict[str, Samples]:
+    mix = WriteMix(dataset, rng)
+
+    def record(name: str, response: httpx.Response) -> None:
+        body = response.json() if response.status_code == 201 else None
+        mix.record(name, response.status_code, body)
+
+    calls = (mix.next_call() for _ in range(requests * WRITE_MIX_FACTOR))
+    samples = await drive(client, calls, concurrency, on_response=record)
+    return dict(sorted(samples.items()))
+
+
+async def run_export(
+    client: httpx.AsyncClient,
+    dataset: Dataset,
+    requests: int,
+    concurrency: int,
+    rng: random.Random,
+) -> dict[str, Samples]:
+    results = {}
+    for route in EXPORT_ROUTES:
+        calls = ((route.name, route.call(dataset, 0)) for _ in range(EXPORT_REQUESTS))
+        results.update(await drive(client, calls, 1))
+    return results
+
+
+RUNNERS = {
+    "cold": run_cold,
+    "warm": run_warm,
+    "write": run_write,
+    "export": run_export,
+}
+
+
+async def clear_redis_cache() -> None:
+    """Drop cached responses and generations so a server starts out cold."""
+    redis = Redis(
+        host=settings.redis.host, port=settings.redis.port, db=settings.redis.db
+    )
+    try:
+        for pattern in (f"{settings.cache.prefix}:*", f"gen:{settings.cache.prefix}:*"):
+            async for key in redis.scan_iter(match=pattern, count=1000):
+                await redis.delete(key)
+    finally:
+        await redis.aclose()
+
+
+@asynccontextmanager
+async def in_process(use_redis: bool) -> AsyncIterator[httpx.AsyncClient]:
+    """Drive the app through ASGITransport, no sockets involved.
+
+    Without ``use_redis`` the lifespan is skipped and responses are cached
+    in process memory, so only the app and Postgres are measured.
+    """
+    async with AsyncExitStack() as stack:
+        if use_redis:
+            await clear_redis_cache()
+            await stack.enter_async_context(app.router.lifespan_context(app))
+        else:
+            FastAPICache.init(
+                InMemoryBackend(),
+                prefix=settings.cache.prefix,
+                coder=make_coder(settings.cache.coder),
+            )
+            stack.push_async_callback(FastAPICache.clear)
+            stack.push_async_callback(db_helper.dispose)
+        client = await stack.enter_async_context(
+            httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=app),
+                base_url="http://bench",
+                timeout=None,
+            )
+        )
+        yield client
+
+
+@asynccontextmanager
+async def uvicorn_server(
+    port: int, workers: int, concurrency: int
+) -> AsyncIterator[httpx.AsyncClient]:
+    """Start ``uvicorn src.main:app`` with the current environment.
+
+    The server needs Redis like in production; its logs go to app.log.
+    """
+    await clear_redis_cache()
+    process = await asyncio.create_subprocess_exec(
+        sys.executable,
+        "-m",
+        "uvicorn",
+        "src.main:app",
+        "--host",
+        "127.0.0.1",
+        "--port",
+        str(port),
+        "--workers",
+        str(workers),
+        "--no-access-log",
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    limits = httpx.Limits(
+        max_connections=concurrency, max_keepalive_connections=concurrency
+    )
+    try:
+        async with httpx.AsyncClient(
+            base_url=f"http://127.0.0.1:{port}", timeout=None, limits=limits
+        ) as client:
+            await wait_until_ready(client, process)
+            yield client
+    finally:
+        if process.returncode is None:
+            process.terminate()
+        await process.wait()
+
+
+async def wait_until_ready(
+    client: httpx.AsyncClient, process: asyncio.subprocess.Process, timeout: float = 30
+) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.returncode is not None:
+            raise RuntimeError(
+                f"uvicorn exited with code {process.returncode}, see app.log"
+            )
+        try:
+            if (await client.get("/")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError(f"uvicorn did not start within {timeout} s")
+
+
+async def run(
+    target: str,
+    mixes: Iterable[str],
+    requests: int,
+    concurrency: int,
+    seed: int = 0,
+    use_redis: bool = False,
+    port: int = 8765,
+    workers: int = 1,
+) -> dict[str, Any]:
+    """Run ``mixes`` against ``target``, each on a freshly started app."""
+    dataset = await load_dataset(db_helper.engine)
+    if target == "asgi" and not await has_trigram(db_helper.engine):
+        settings.search.fuzzy = False
+
+    results = []
+    for mix in mixes:
+        rng = random.Random(seed)
+        if target == "asgi":
+            server = in_process(use_redis)
+        else:
+            server = uvicorn_server(port, workers, concurrency)
+        async with server as client:
+            logger.info("Running %s mix against %s", mix, target)
+            samples = await RUNNERS[mix](client, dataset, requests, concurrency, rng)
+        results.extend(
+            {"mix": mix, "route": route, **x.summary()} for route, x in samples.items()
+        )
+    await db_helper.dispose()
+
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "target": target,
+            "redis": use_redis or target == "uvicorn",
+            "workers": workers if target == "uvicorn" else None,
+            "requests": requests,
+            "concurrency": concurrency,
+            "seed": seed,
+            "dataset": {"books": dataset.books, "authors": dataset.authors},
+            "python": platform.python_version(),
+        },
+        "results": results,
+    }
+
+
+def git_commit() -> str | None:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip()
+
+
+def save(report: dict[str, Any], output: Path | None = None) -> Path:
+    if output is None:
+        meta = report["meta"]
+        stamp = meta["timestamp"].replace(":", "").replace("+0000", "")
+        name = f"{stamp}-{meta['target']}-{meta['dataset']['books']}.json"
+        output = RESULTS_DIR / name
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    return output
+
+
+def format_report(report: dict[str, Any]) -> str:
+    lines = [
+        f"{'mix':<7}{'route':<42}{'n':>6}{'err':>5}"
+        f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'rps':>9}"
+    ]
+    for x in report["results"]:
+        lines.append(
+            f"{x['mix']:<7}{x['route']:<42}{x['requests']:>6}{x['errors']:>5}"
+            f"{x['p50_ms']:>10.2f}{x['p95_ms']:>10.2f}{x['p99_ms']:>10.2f}"
+            f"{x['rps']:>9.1f}"
+        )
+    return "\n".join(lines)
+
+
+def compare(old: dict[str, Any], new: dict[str, Any]) -> str:
+    """Side by side p50/p99/rps of routes present in both reports."""
+    before = {(x["mix"], x["route"]): x for x in old["results"]}
+    lines = [f"{'mix':<7}{'route':<42}{'p50 ms':>18}{'p99 ms':>18}{'rps':>18}"]
+    for x in new["results"]:
+        y = before.get((x["mix"], x["route"]))
+        if y is None:
+            continue
+        cells = "".join(
+            f"{change(y[metric], x[metric]):>18}"
+            for metric in ("p50_ms", "p99_ms", "rps")
+        )
+        lines.append(f"{x['mix']:<7}{x['route']:<42}{cells}")
+    return "\n".join(lines)
+
+
+def change(old: float, new: float) -> str:
+    if not old:
+        return f"{new:.1f}"
+    return f"{new:.1f} ({(new - old) / old:+.0%})"
@@ -0,0 +1,177 @@
+import random
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from src.core.utils import encode_cursor
+from .seed import WORDS, Dataset
+
+# Keys requested over and over by the warm mix; each is fetched once before
+# measuring so the timed requests are cache hits
+WARM_KEYS = 20
+
+
+@dataclass(frozen=True)
+class Call:
+    method: str
+    url: str
+    params: dict[str, Any] | None = None
+    json: Any = None
+
+
+@dataclass(frozen=True)
+class Route:
+    """An endpoint and how to build its ``key``-th distinct request.
+
+    Requests for different keys get different cache keys, so the cold mix
+    draws every key at most once. ``keys`` is the size of that space.
+    """
+
+    name: str
+    keys: Callable[[Dataset], int]
+    call: Callable[[Dataset, int], Call]
+
+
+def search_terms(key: int) -> str:
+    first, second = divmod(key, len(WORDS))
+    if first == 0:
+        return WORDS[second]
+    return f"{WORDS[first - 1]} {WORDS[second]}"
+
+
+SEARCH_KEYS = len(WORDS) * (len(WORDS) + 1)
+STATS_LIMITS = 500
+
+READ_ROUTES = [
+    Route(
+        "GET /books/",
+        lambda d: d.books,
+        lambda d, k: Call("GET", "/books/", {"cursor": encode_cursor(k)}),
+    ),
+    Route(
+        "GET /books/?year_from&sort",
+        lambda d: 125,
+        lambda d, k: Call(
+            "GET", "/books/", {"year_from": 1900 + k % 125, "sort": "-year"}
+        ),
+    ),
+    Route(
+        "GET /books/{book_id}",
+        lambda d: d.books,
+        lambda d, k: Call("GET", f"/books/{1 + k}"),
+    ),
+    Route(
+        "GET /books/search",
+        lambda d: SEARCH_KEYS,
+        lambda d, k: Call("GET", "/books/search", {"q": search_terms(k)}),
+    ),
+    Route(
+        "GET /authors/",
+        lambda d: d.authors,
+        lambda d, k: Call("GET", "/authors/", {"cursor": encode_cursor(k)}),
+    ),
+    Route(
+        "GET /authors/?include=books",
+        lambda d: d.authors,
+        lambda d, k: Call(
+            "GET", "/authors/", {"cursor": encode_cursor(k), "include": "books"}
+        ),
+    ),
+    Route(
+        "GET /authors/{author_id}",
+        lambda d: d.authors,
+        lambda d, k: Call("GET", f"/authors/{1 + k}"),
+    ),
+    Route(
+        "GET /authors/{author_id}?include=books",
+        lambda d: d.authors,
+        lambda d, k: Call("GET", f"/authors/{1 + k}", {"include": "books"}),
+    ),
+    Route(
+        "GET /authors/search",
+        lambda d: SEARCH_KEYS,
+        lambda d, k: Call("GET", "/authors/search", {"q": search_terms(k)}),
+    ),
+    Route(
+        "GET /stats/totals",
+        lambda d: 1,
+        lambda d, k: Call("GET", "/stats/totals"),
+    ),
+    Route(
+        "GET /stats/books-per-author",
+        lambda d: STATS_LIMITS,
+        lambda d, k: Call("GET", "/stats/books-per-author", {"limit": 1 + k}),
+    ),
+    Route(
+        "GET /stats/books-per-year",
+        lambda d: 1,
+        lambda d, k: Call("GET", "/stats/books-per-year"),
+    ),
+    Route(
+        "GET /stats/authors-per-age",
+        lambda d: 1,
+        lambda d, k: Call("GET", "/stats/authors-per-age"),
+    ),
+]
+
+# Uncached full-table exports, run only by the export mix
+EXPORT_ROUTES = [
+    Route("GET /books/stream", lambda d: 1, lambda d, k: Call("GET", "/books/stream")),
+    Route("GET /books/csv", lambda d: 1, lambda d, k: Call("GET", "/books/csv")),
+    Route(
+        "GET /authors/stream", lambda d: 1, lambda d, k: Call("GET", "/authors/stream")
+    ),
+    Route("GET /authors/csv", lambda d: 1, lambda d, k: Call("GET", "/authors/csv")),
+]
+
+
+def new_book(dataset: Dataset, rng: random.Random) -> dict[str, Any]:
+    return {
+        "title": f"{rng.choice(WORDS).title()} {rng.choice(WORDS)}",
+        "year": rng.randint(1900, 2025),
+        "author_id": rng.randint(1, dataset.authors),
+    }
+
+
+class WriteMix:
+    """Requests of the write-heavy mix: 70% writes, 30% reads of hot keys.
+
+    Updates touch seeded rows and deletes only remove books created by the
+    run itself, so repeated runs see roughly the same dataset.
+    """
+
+    def __init__(self, dataset: Dataset, rng: random.Random):
+        self.dataset = dataset
+        self.rng = rng
+        self.created: list[int] = []
+
+    def next_call(self) -> tuple[str, Call]:
+        dataset, rng = self.dataset, self.rng
+        book_id = rng.randint(1, dataset.books)
+        roll = rng.random()
+        if roll < 0.20:
+            return "POST /books/", Call("POST", "/books/", json=new_book(dataset, rng))
+        if roll < 0.25:
+            books = [new_book(dataset, rng) for _ in range(50)]
+            return "POST /books/bulk", Call("POST", "/books/bulk", json=books)
+        if roll < 0.40:
+            year = {"year": rng.randint(1900, 2025)}
+            return "PATCH /books/{book_id}", Call(
+                "PATCH", f"/books/{book_id}", json=year
+            )
+        if roll < 0.50:
+            book = new_book(dataset, rng)
+            return "PUT /books/{book_id}", Call("PUT", f"/books/{book_id}", json=book)
+        if roll < 0.60 and self.created:
+            created = self.created.pop()
+            return "DELETE /books/{book_id}", Call("DELETE", f"/books/{created}")
+        if roll < 0.70:
+            author_id = rng.randint(1, dataset.authors)
+            return "PATCH /authors/{author_id}", Call(
+                "PATCH", f"/authors/{author_id}", json={"age": rng.randint(18, 90)}
+            )
+        route = rng.choice(READ_ROUTES)
+        return route.name, route.call(dataset, rng.randrange(WARM_KEYS))
+
+    def record(self, name: str, status: int, body: Any) -> None:
+        if name == "POST /books/" and status == 201:
+            self.created.append(body["id"])
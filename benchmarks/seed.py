@@ -0,0 +1,124 @@
+import logging
+from dataclasses import dataclass
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from src.core.models import Base
+
+logger = logging.getLogger(__name__)
+
+# Titles and names are built from these so search queries have matches
+WORDS = [
+    "river", "night", "garden", "winter", "stone", "light", "shadow", "city",
+    "forest", "letter", "storm", "silver", "island", "mirror", "road", "summer",
+    "fire", "glass", "harbor", "crown", "dream", "ocean", "tower", "wolf",
+    "autumn", "bridge", "desert", "empire", "flower", "ghost", "honey", "iron",
+]  # fmt: skip
+
+
+@dataclass(frozen=True)
+class Dataset:
+    books: int
+    authors: int
+
+
+async def seed(engine: AsyncEngine, books: int, books_per_author: int = 10) -> Dataset:
+    """Recreate the schema and fill it with ``books`` generated books.
+
+    Rows are generated by Postgres itself, so a million books take seconds.
+    Ids are dense: authors 1..authors, books 1..books.
+    """
+    authors = max(1, books // books_per_author)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with engine.begin() as conn:
+        await conn.execute(
+            text(
+                "INSERT INTO authors (first_name, last_name, age, email) "
+                "SELECT initcap((:words)[1 + i % n]), "
+                "initcap((:words)[1 + (i / n) % n]) || i, "
+                "18 + i % 70, 'author' || i || '@example.com' "
+                "FROM generate_series(1, :authors) AS i, "
+                "cardinality(CAST(:words AS text[])) AS n"
+            ),
+            {"words": WORDS, "authors": authors},
+        )
+        await conn.execute(
+            text(
+                "INSERT INTO books (title, year, author_id) "
+                "SELECT initcap((:words)[1 + i % n]) || ' ' "
+                "|| (:words)[1 + (i / n) % n] || ' ' || i, "
+                "1900 + i % 125, 1 + i % :authors "
+                "FROM generate_series(1, :books) AS i, "
+                "cardinality(CAST(:words AS text[])) AS n"
+            ),
+            {"words": WORDS, "authors": authors, "books": books},
+        )
+        # Same backfill as the catalog_stats migration
+        for metric, column, table in (
+            ("books_per_author", "author_id", "books"),
+            ("books_per_year", "year", "books"),
+            ("authors_per_age", "age", "authors"),
+        ):
+            await conn.execute(
+                text(
+                    f"INSERT INTO catalog_stats (metric, key, total) "
+                    f"SELECT :metric, {column}, count(*) FROM {table} "
+                    f"GROUP BY {column}"
+                ),
+                {"metric": metric},
+            )
+
+    await create_trigram_indexes(engine)
+
+    async with engine.connect() as conn:
+        await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text("VACUUM ANALYZE"))
+
+    logger.info("Seeded %d books by %d authors", books, authors)
+    return Dataset(books=books, authors=authors)
+
+
+async def create_trigram_indexes(engine: AsyncEngine) -> bool:
+    """Create the search migration's pg_trgm indexes, if the extension is available."""
+    try:
+        async with engine.begin() as conn:
+            await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            for table, column in (
+                ("authors", "first_name"),
+                ("authors", "last_name"),
+                ("books", "title"),
+            ):
+                await conn.execute(
+                    text(
+                        f"CREATE INDEX IF NOT EXISTS ix_{table}_{column}_trgm "
+                        f"ON {table} USING gin ({column} gin_trgm_ops)"
+                    )
+                )
+    except DBAPIError:
+        logger.warning("pg_trgm is not available, fuzzy search is not benchmarked")
+        return False
+    return True
+
+
+async def load_dataset(engine: AsyncEngine) -> Dataset:
+    async with engine.connect() as conn:
+        books = await conn.scalar(text("SELECT coalesce(max(id), 0) FROM books"))
+        authors = await conn.scalar(text("SELECT coalesce(max(id), 0) FROM authors"))
+    if not books or not authors:
+        raise RuntimeError("The database is empty, run `python -m benchmarks seed`")
+    return Dataset(books=books, authors=authors)
+
+
+async def has_trigram(engine: AsyncEngine) -> bool:
+    async with engine.connect() as conn:
+        return bool(
+            await conn.scalar(
+                text("SELECT count(*) FROM pg_extension WHERE extname = 'pg_trgm'")
+            )
+        )
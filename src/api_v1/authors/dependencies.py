@@ -5,6 +5,8 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from src.api_v1.authors.service import AuthorsService
 from src.core.db import db_helper
 from src.api_v1.authors.repository import AuthorsRepository
+from src.api_v1.stats.dependencies import get_stats_repository
+from src.api_v1.stats.repository import StatsRepository
 
 logger = logging.getLogger(__name__)
 
@@ -17,5 +19,6 @@ def get_author_repository(
 
 def get_author_service(
     author_repository: AuthorsRepository = Depends(get_author_repository),
+    stats_repository: StatsRepository = Depends(get_stats_repository),
 ):
-    return AuthorsService(author_repository)
+    return AuthorsService(author_repository, stats_repository)
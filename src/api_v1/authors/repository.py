@@ -1,17 +1,40 @@
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 
 from src.core.models import AuthorModel
 from src.core.base_repository import BaseRepository
 
 
 class AuthorsRepository(BaseRepository[AuthorModel]):
+    fuzzy_columns = ("first_name", "last_name")
 
     def __init__(self, db: AsyncSession):
         super().__init__(model=AuthorModel, db=db)
 
-    async def delete_all_authors(self) -> None:
+    @staticmethod
+    def filter_clauses(
+        last_name: str | None = None,
+        age_from: int | None = None,
+        age_to: int | None = None,
+    ) -> list:
+        clauses = []
+        if last_name is not None:
+            clauses.append(AuthorModel.last_name == last_name)
+        if age_from is not None:
+            clauses.append(AuthorModel.age >= age_from)
+        if age_to is not None:
+            clauses.append(AuthorModel.age <= age_to)
+        return clauses
+
+    @staticmethod
+    def with_books() -> list:
+        # One extra SELECT ... WHERE author_id IN (...) for the whole result
+        return [selectinload(AuthorModel.books)]
+
+    async def delete_all_authors(self, commit: bool = True) -> None:
         command = text("TRUNCATE TABLE authors RESTART IDENTITY CASCADE")
 
         await self.db.execute(command)
-        await self.db.commit()
+        if commit:
+            await self.db.commit()
@@ -1,40 +1,135 @@
-from typing import Annotated
+from typing import Annotated, Literal
 
-from fastapi import APIRouter, status, Depends
-from fastapi_cache.decorator import cache
+from fastapi import APIRouter, status, Depends, Query, Body, Request, Response
+from fastapi.responses import StreamingResponse
 
-from src.core.utils import custom_key_builder
+from src.core.cache import cache, entity_etag
+from src.core.utils import custom_key_builder, search_query, if_match_version
 from src.core.config import settings
+from src.core.responses import JSONBytesResponse, json_response
+from src.core.schemas import Page, ImportResult
 from .dependencies import get_author_service
-from .schemas import AuthorId, AuthorUpdate, AuthorUpdatePartial, AuthorCreate
+from .schemas import (
+    AuthorId,
+    AuthorUpdate,
+    AuthorUpdatePartial,
+    AuthorCreate,
+    AuthorWithBooks,
+    AuthorFilter,
+)
 from .service import AuthorsService
 
 router = APIRouter(prefix="/authors", tags=["Автори"])
 
 
-@router.get("/{author_id}", summary="Отримати одного автора", response_model=AuthorId)
+@router.get("/search", summary="Пошук авторів за іменем", response_model=Page[AuthorId])
+@cache(
+    expire=settings.cache.expire,
+    namespace=settings.cache.namespace.authors.authors_search,
+    key_builder=custom_key_builder,
+)
+async def search_authors(
+    q: Annotated[str, Depends(search_query)],
+    author_service: Annotated[AuthorsService, Depends(get_author_service)],
+    cursor: str | None = None,
+    limit: Annotated[
+        int, Query(ge=1, le=settings.pagination.max_limit)
+    ] = settings.pagination.default_limit,
+) -> JSONBytesResponse:
+    page = await author_service.search_authors(q=q, cursor=cursor, limit=limit)
+    return json_response(Page[AuthorId], page)
+
+
+@router.get(
+    "/stream",
+    summary="Отримати всіх авторів потоком (NDJSON)",
+    response_class=StreamingResponse,
+)
+async def stream_authors(
+    author_service: Annotated[AuthorsService, Depends(get_author_service)],
+) -> StreamingResponse:
+    return StreamingResponse(
+        author_service.stream_authors(), media_type="application/x-ndjson"
+    )
+
+
+@router.get(
+    "/csv",
+    summary="Експортувати авторів у CSV",
+    response_class=StreamingResponse,
+)
+async def export_authors_csv(
+    author_service: Annotated[AuthorsService, Depends(get_author_service)],
+) -> StreamingResponse:
+    return StreamingResponse(
+        author_service.export_csv(),
+        media_type="text/csv",
+        headers={"Content-Disposition": 'attachment; filename="authors.csv"'},
+    )
+
+
+@router.post(
+    "/csv",
+    summary="Імпортувати авторів з CSV",
+    response_model=ImportResult,
+    status_code=status.HTTP_201_CREATED,
+)
+async def import_authors_csv(
+    request: Request,
+    author_service: Annotated[AuthorsService, Depends(get_author_service)],
+) -> ImportResult:
+    return await author_service.import_csv(request.stream())
+
+
+@router.get(
+    "/{author_id}",
+    summary="Отримати одного автора",
+    response_model=AuthorId | AuthorWithBooks,
+)
 @cache(
-    expire=60,
+    expire=settings.cache.expire,
     key_builder=custom_key_builder,
     namespace=settings.cache.namespace.authors.author,
 )
 async def get_author(
     author_id: int,
     author_service: Annotated[AuthorsService, Depends(get_author_service)],
-) -> AuthorId:
-    return await author_service.get_author(author_id)
+    include: Literal["books"] | None = None,
+) -> JSONBytesResponse:
+    author = await author_service.get_author(
+        author_id, include_books=include == "books"
+    )
+    # With books the body also changes when a book does, the cache hashes it
+    headers = {} if include else {"ETag": entity_etag(author)}
+    return json_response(type(author), author, headers=headers)
 
 
-@router.get("/", summary="Отримати всіх авторів", response_model=list[AuthorId])
+@router.get(
+    "/",
+    summary="Отримати всіх авторів",
+    response_model=Page[AuthorId] | Page[AuthorWithBooks],
+)
 @cache(
-    expire=60,
+    expire=settings.cache.expire,
     key_builder=custom_key_builder,
     namespace=settings.cache.namespace.authors.authors_list,
 )
 async def get_authors(
     author_service: Annotated[AuthorsService, Depends(get_author_service)],
-) -> list[AuthorId]:
-    return await author_service.get_authors()
+    filters: Annotated[AuthorFilter, Depends()],
+    cursor: str | None = None,
+    limit: Annotated[
+        int, Query(ge=1, le=settings.pagination.max_limit)
+    ] = settings.pagination.default_limit,
+    include: Literal["books"] | None = None,
+) -> JSONBytesResponse:
+    page = await author_service.get_authors(
+        cursor=cursor,
+        limit=limit,
+        filters=filters,
+        include_books=include == "books",
+    )
+    return json_response(type(page), page)
 
 
 @router.post(
@@ -50,13 +145,34 @@ async def create_author(
     return await author_service.create_author(new_author)
 
 
+@router.post(
+    "/bulk",
+    summary="Додати авторів пакетом",
+    response_model=list[AuthorId],
+    status_code=status.HTTP_201_CREATED,
+)
+async def create_authors(
+    new_authors: Annotated[
+        list[AuthorCreate], Body(min_length=1, max_length=settings.bulk.max_items)
+    ],
+    author_service: Annotated[AuthorsService, Depends(get_author_service)],
+) -> list[AuthorId]:
+    return await author_service.create_authors(new_authors)
+
+
 @router.put("/{author_id}", summary="Оновити дані про автора", response_model=AuthorId)
 async def update_author(
     author_id: int,
     author_update: AuthorUpdate,
     author_service: Annotated[AuthorsService, Depends(get_author_service)],
+    version: Annotated[int | None, Depends(if_match_version)],
+    response: Response,
 ) -> AuthorId:
-    return await author_service.update_author(author_id, author_update)
+    author = await author_service.update_author(
+        author_id, author_update, version=version
+    )
+    response.headers["ETag"] = entity_etag(author)
+    return author
 
 
 @router.patch(
@@ -66,8 +182,14 @@ async def update_author_partial(
     author_id: int,
     author_update: AuthorUpdatePartial,
     author_service: Annotated[AuthorsService, Depends(get_author_service)],
+    version: Annotated[int | None, Depends(if_match_version)],
+    response: Response,
 ) -> AuthorId:
-    return await author_service.update_author(author_id, author_update, partial=True)
+    author = await author_service.update_author(
+        author_id, author_update, partial=True, version=version
+    )
+    response.headers["ETag"] = entity_etag(author)
+    return author
 
 
 @router.delete(
@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic import BaseModel, Field, EmailStr, ConfigDict
 
 
@@ -31,4 +33,23 @@ class AuthorUpdatePartial(BaseModel):
 
 class AuthorId(AuthorBase):
     id: int
+    version: int
+    model_config = ConfigDict(from_attributes=True)
+
+
+class AuthorBook(BaseModel):
+    id: int
+    title: str
+    year: int
     model_config = ConfigDict(from_attributes=True)
+
+
+class AuthorWithBooks(AuthorId):
+    books: list[AuthorBook]
+
+
+class AuthorFilter(BaseModel):
+    last_name: str | None = None
+    age_from: int | None = None
+    age_to: int | None = None
+    sort: Literal["id", "-id", "last_name", "-last_name", "age", "-age"] = "id"
@@ -1,89 +1,177 @@
 import logging
-from fastapi_cache import FastAPICache
+from collections import Counter
+from typing import AsyncIterator, AsyncIterable, Sequence
 
+from src.core.cache import invalidate, cache_entity
 from src.core.mixins import ServiceMixin
 from src.core.config import settings
+from src.core.schemas import Page, ImportResult
+from src.core.models import StatMetric
 from src.api_v1.authors.repository import AuthorsRepository
+from src.api_v1.stats.repository import StatsRepository
 from src.api_v1.authors.schemas import *
 
 logger = logging.getLogger(__name__)
 
 
 class AuthorsService(ServiceMixin):
-    def __init__(self, author_repo: AuthorsRepository):
+    def __init__(self, author_repo: AuthorsRepository, stats_repo: StatsRepository):
         self.author_repo = author_repo
+        self.stats_repo = stats_repo
 
-    async def get_authors(self) -> list[AuthorId]:
-        logger.info("Get all authors")
-        authors = await self.author_repo.get_all()
-        return [AuthorId.model_validate(x) for x in authors]
+    async def get_authors(
+        self,
+        cursor: str | None,
+        limit: int,
+        filters: AuthorFilter = AuthorFilter(),
+        include_books: bool = False,
+    ) -> Page[AuthorId] | Page[AuthorWithBooks]:
+        logger.info("Get authors page")
+        return await self.fetch_page(
+            self.author_repo,
+            AuthorWithBooks if include_books else AuthorId,
+            cursor,
+            limit,
+            sort=filters.sort,
+            where=self.author_repo.filter_clauses(
+                **filters.model_dump(exclude={"sort"})
+            ),
+            options=self.author_repo.with_books() if include_books else (),
+        )
+
+    async def search_authors(
+        self, q: str, cursor: str | None, limit: int
+    ) -> Page[AuthorId]:
+        logger.info("Search authors: %s", q)
+        offset = self.search_offset(cursor)
+        authors = await self.author_repo.search(
+            q, offset=offset, limit=limit + 1, fuzzy=settings.search.fuzzy
+        )
+        return self.make_offset_page(authors, offset, limit, AuthorId)
+
+    async def stream_authors(self) -> AsyncIterator[bytes]:
+        logger.info("Stream all authors")
+        batch_size = settings.db.stream_batch_size
+        async for author in self.author_repo.stream_all(batch_size):
+            yield AuthorId.model_validate(author).model_dump_json().encode() + b"\n"
 
-    async def get_author(self, author_id: int) -> AuthorId:
-        logger.info(f"Get author {author_id}")
+    async def get_author(
+        self, author_id: int, include_books: bool = False
+    ) -> AuthorId | AuthorWithBooks:
+        logger.info("Get author %s", author_id)
 
+        options = self.author_repo.with_books() if include_books else ()
         author = self.get_or_404(
-            await self.author_repo.get_one(author_id), detail="Author not found"
+            await self.author_repo.get_one(author_id, options=options),
+            detail="Author not found",
         )
 
+        if include_books:
+            return AuthorWithBooks.model_validate(author)
         return AuthorId.model_validate(author)
 
     async def create_author(self, new_author: AuthorCreate) -> AuthorId:
-        logger.info(f"Creating author: {new_author.first_name}")
+        logger.info("Creating author: %s", new_author.first_name)
+
+        author = AuthorId.model_validate(
+            await self.author_repo.create(new_author.model_dump(), commit=False)
+        )
+        await self.stats_repo.apply(StatMetric.AUTHORS_PER_AGE, {author.age: 1})
+        await self.author_repo.commit()
 
-        author = await self.author_repo.create(new_author.model_dump())
+        namespace = settings.cache.namespace.authors
+        await invalidate(*namespace.on_write)
+        await cache_entity(namespace.author, "author_id", author)
+        return author
 
-        await FastAPICache.clear(
-            namespace=settings.cache.namespace.authors.authors_list
+    async def create_authors(self, new_authors: list[AuthorCreate]) -> list[AuthorId]:
+        logger.info("Creating %s authors", len(new_authors))
+
+        authors = await self.author_repo.create_many(
+            [x.model_dump() for x in new_authors], commit=False
         )
-        return AuthorId.model_validate(author)
+        await self.stats_repo.apply(
+            StatMetric.AUTHORS_PER_AGE, Counter(x.age for x in new_authors)
+        )
+        await self.author_repo.commit()
+
+        await invalidate(*settings.cache.namespace.authors.on_write)
+        return [AuthorId.model_validate(x) for x in authors]
+
+    def export_csv(self) -> AsyncIterator[bytes]:
+        logger.info("Export authors to CSV")
+        return self.author_repo.export_csv()
+
+    async def import_csv(self, chunks: AsyncIterable[bytes]) -> ImportResult:
+        logger.info("Import authors from CSV")
+
+        async def count_ages(columns: Sequence[str]) -> None:
+            await self.stats_repo.apply_staged(
+                StatMetric.AUTHORS_PER_AGE, self.author_repo.staging_table, "age"
+            )
+
+        imported = await self.load_csv(
+            self.author_repo, chunks, AuthorCreate, count_ages
+        )
+
+        await invalidate(*settings.cache.namespace.authors.on_write)
+        return ImportResult(imported=imported)
 
     async def update_author(
         self,
         author_id: int,
         author_update: AuthorUpdate | AuthorUpdatePartial,
         partial: bool = False,
+        version: int | None = None,
     ) -> AuthorId:
 
-        author = self.get_or_404(
-            await self.author_repo.get_one(author_id), detail="Author not found"
-        )
-
         update_data = author_update.model_dump(exclude_unset=partial)
 
-        updated_author = await self.author_repo.update(
-            db_obj=author, update_data=update_data
+        updated = await self.author_repo.update_by_id_with_previous(
+            author_id, update_data, ("age",), commit=False, version=version
         )
+        if updated is None:
+            await self.check_version(self.author_repo, author_id, version)
+        updated_author, previous = self.get_or_404(updated, detail="Author not found")
 
-        await FastAPICache.clear(
-            namespace=settings.cache.namespace.authors.authors_list
-        )
-        await FastAPICache.clear(
-            namespace=f"{settings.cache.namespace.authors.author}:{author_id}"
-        )
+        author = AuthorId.model_validate(updated_author)
+        ages = Counter({author.age: 1})
+        ages[previous["age"]] -= 1
+        await self.stats_repo.apply(StatMetric.AUTHORS_PER_AGE, ages)
+        await self.author_repo.commit()
 
-        return AuthorId.model_validate(updated_author)
+        namespace = settings.cache.namespace.authors
+        await invalidate(*namespace.on_write, f"{namespace.author}:{author_id}")
+        await cache_entity(namespace.author, "author_id", author)
+
+        return author
 
     async def delete_author(self, author_id: int) -> None:
-        logger.info(f"Deleting author {author_id}")
+        logger.info("Deleting author %s", author_id)
 
+        # The row lock keeps new books out until the cascade has run
         author = self.get_or_404(
-            await self.author_repo.get_one(author_id), detail="Author not found"
+            await self.author_repo.get_one(author_id, for_update=True),
+            detail="Author not found",
         )
-
-        await self.author_repo.delete(author)
-
-        await FastAPICache.clear(
-            namespace=settings.cache.namespace.authors.authors_list
-        )
-        await FastAPICache.clear(
-            namespace=f"{settings.cache.namespace.authors.author}:{author_id}"
+        await self.stats_repo.remove_author_books(author_id)
+        await self.stats_repo.apply(StatMetric.AUTHORS_PER_AGE, {author.age: -1})
+        await self.author_repo.delete_by_id(author_id, commit=False)
+        await self.author_repo.commit()
+
+        namespace = settings.cache.namespace.authors
+        await invalidate(
+            *namespace.on_write,
+            *namespace.on_delete,
+            f"{namespace.author}:{author_id}",
         )
 
     async def delete_all_authors(self):
-        logger.info(f"Delete all authors")
+        logger.info("Delete all authors")
 
-        await self.author_repo.delete_all_authors()
+        await self.stats_repo.reset(*StatMetric)
+        await self.author_repo.delete_all_authors(commit=False)
+        await self.author_repo.commit()
 
-        await FastAPICache.clear(
-            namespace=settings.cache.namespace.authors.authors_list
-        )
+        namespace = settings.cache.namespace.authors
+        await invalidate(*namespace.on_write, *namespace.on_delete, namespace.author)
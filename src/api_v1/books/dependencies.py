@@ -7,6 +7,8 @@ from src.api_v1.authors.repository import AuthorsRepository
 from src.api_v1.books.repository import BooksRepository
 from src.core.db import db_helper
 from src.api_v1.authors.dependencies import get_author_repository
+from src.api_v1.stats.dependencies import get_stats_repository
+from src.api_v1.stats.repository import StatsRepository
 
 logger = logging.getLogger(__name__)
 
@@ -20,5 +22,6 @@ def get_book_repository(
 def get_book_service(
     book_repo: BooksRepository = Depends(get_book_repository),
     author_repo: AuthorsRepository = Depends(get_author_repository),
+    stats_repo: StatsRepository = Depends(get_stats_repository),
 ):
-    return BooksService(book_repo, author_repo)
+    return BooksService(book_repo, author_repo, stats_repo)
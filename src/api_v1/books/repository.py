@@ -11,11 +11,39 @@ logger = logging.getLogger(__name__)
 
 
 class BooksRepository(BaseRepository[BookModel]):
+    fuzzy_columns = ("title",)
+
     def __init__(self, db: AsyncSession):
         super().__init__(model=BookModel, db=db)
 
-    async def delete_all_books(self) -> None:
+    @staticmethod
+    def filter_clauses(
+        author_id: int | None = None,
+        year_from: int | None = None,
+        year_to: int | None = None,
+    ) -> list:
+        clauses = []
+        if author_id is not None:
+            clauses.append(BookModel.author_id == author_id)
+        if year_from is not None:
+            clauses.append(BookModel.year >= year_from)
+        if year_to is not None:
+            clauses.append(BookModel.year <= year_to)
+        return clauses
+
+    async def delete_all_books(self, commit: bool = True) -> None:
         command = text("TRUNCATE TABLE books RESTART IDENTITY CASCADE")
 
         await self.db.execute(command)
-        await self.db.commit()
+        if commit:
+            await self.db.commit()
+
+    async def staged_missing_author_ids(self, limit: int = 100) -> list[int]:
+        command = text(
+            f"SELECT DISTINCT s.author_id FROM {self.staging_table} s "
+            f"LEFT JOIN authors a ON a.id = s.author_id "
+            f"WHERE a.id IS NULL ORDER BY s.author_id LIMIT :limit"
+        )
+
+        result = await self.db.execute(command, {"limit": limit})
+        return list(result.scalars().all())
@@ -1,40 +1,109 @@
 from typing import Annotated
 
-from fastapi import APIRouter, status, Depends
-from fastapi_cache.decorator import cache
+from fastapi import APIRouter, status, Depends, Query, Body, Request, Response
+from fastapi.responses import StreamingResponse
 
-from src.core.utils import custom_key_builder
+from src.core.cache import cache, entity_etag
+from src.core.utils import custom_key_builder, search_query, if_match_version
 from src.core.config import settings
-from .schemas import BookId, BookUpdatePartial, BookUpdate, BookCreate
+from src.core.responses import JSONBytesResponse, json_response
+from src.core.schemas import Page, ImportResult
+from .schemas import BookId, BookUpdatePartial, BookUpdate, BookCreate, BookFilter
 from .dependencies import get_book_service
 from .service import BooksService
 
 router = APIRouter(prefix="/books", tags=["Книги"])
 
 
-@router.get("/", summary="Отримати усі книжки", response_model=list[BookId])
+@router.get("/", summary="Отримати усі книжки", response_model=Page[BookId])
 @cache(
-    expire=60,
+    expire=settings.cache.expire,
     namespace=settings.cache.namespace.books.books_list,
     key_builder=custom_key_builder,
 )
 async def get_books(
     book_service: Annotated[BooksService, Depends(get_book_service)],
-) -> list[BookId]:
-    return await book_service.get_books()
+    filters: Annotated[BookFilter, Depends()],
+    cursor: str | None = None,
+    limit: Annotated[
+        int, Query(ge=1, le=settings.pagination.max_limit)
+    ] = settings.pagination.default_limit,
+) -> JSONBytesResponse:
+    page = await book_service.get_books(cursor=cursor, limit=limit, filters=filters)
+    return json_response(Page[BookId], page)
+
+
+@router.get("/search", summary="Пошук книг за назвою", response_model=Page[BookId])
+@cache(
+    expire=settings.cache.expire,
+    namespace=settings.cache.namespace.books.books_search,
+    key_builder=custom_key_builder,
+)
+async def search_books(
+    q: Annotated[str, Depends(search_query)],
+    book_service: Annotated[BooksService, Depends(get_book_service)],
+    cursor: str | None = None,
+    limit: Annotated[
+        int, Query(ge=1, le=settings.pagination.max_limit)
+    ] = settings.pagination.default_limit,
+) -> JSONBytesResponse:
+    page = await book_service.search_books(q=q, cursor=cursor, limit=limit)
+    return json_response(Page[BookId], page)
+
+
+@router.get(
+    "/stream",
+    summary="Отримати усі книжки потоком (NDJSON)",
+    response_class=StreamingResponse,
+)
+async def stream_books(
+    book_service: Annotated[BooksService, Depends(get_book_service)],
+) -> StreamingResponse:
+    return StreamingResponse(
+        book_service.stream_books(), media_type="application/x-ndjson"
+    )
+
+
+@router.get(
+    "/csv",
+    summary="Експортувати книги у CSV",
+    response_class=StreamingResponse,
+)
+async def export_books_csv(
+    book_service: Annotated[BooksService, Depends(get_book_service)],
+) -> StreamingResponse:
+    return StreamingResponse(
+        book_service.export_csv(),
+        media_type="text/csv",
+        headers={"Content-Disposition": 'attachment; filename="books.csv"'},
+    )
+
+
+@router.post(
+    "/csv",
+    summary="Імпортувати книги з CSV",
+    response_model=ImportResult,
+    status_code=status.HTTP_201_CREATED,
+)
+async def import_books_csv(
+    request: Request,
+    book_service: Annotated[BooksService, Depends(get_book_service)],
+) -> ImportResult:
+    return await book_service.import_csv(request.stream())
 
 
 @router.get("/{book_id}", summary="Отримати одну книгу", response_model=BookId)
 @cache(
-    expire=60,
+    expire=settings.cache.expire,
     namespace=settings.cache.namespace.books.book,
     key_builder=custom_key_builder,
 )
 async def get_book(
     book_id: int,
     book_service: Annotated[BooksService, Depends(get_book_service)],
-) -> BookId:
-    return await book_service.get_book(book_id)
+) -> JSONBytesResponse:
+    book = await book_service.get_book(book_id)
+    return json_response(BookId, book, headers={"ETag": entity_etag(book)})
 
 
 @router.post(
@@ -50,6 +119,21 @@ async def create_book(
     return await book_service.create_book(new_book=new_book)
 
 
+@router.post(
+    "/bulk",
+    summary="Додати книги пакетом",
+    response_model=list[BookId],
+    status_code=status.HTTP_201_CREATED,
+)
+async def create_books(
+    new_books: Annotated[
+        list[BookCreate], Body(min_length=1, max_length=settings.bulk.max_items)
+    ],
+    book_service: Annotated[BooksService, Depends(get_book_service)],
+) -> list[BookId]:
+    return await book_service.create_books(new_books=new_books)
+
+
 @router.put(
     "/{book_id}",
     summary="Оновити повністью книгу",
@@ -59,8 +143,14 @@ async def update_book(
     book_id: int,
     book_update: BookUpdate,
     book_service: Annotated[BooksService, Depends(get_book_service)],
+    version: Annotated[int | None, Depends(if_match_version)],
+    response: Response,
 ) -> BookId:
-    return await book_service.update_book(book_id=book_id, book_update=book_update)
+    book = await book_service.update_book(
+        book_id=book_id, book_update=book_update, version=version
+    )
+    response.headers["ETag"] = entity_etag(book)
+    return book
 
 
 @router.patch(
@@ -72,10 +162,14 @@ async def update_book_partial(
     book_id: int,
     book_update: BookUpdatePartial,
     book_service: Annotated[BooksService, Depends(get_book_service)],
+    version: Annotated[int | None, Depends(if_match_version)],
+    response: Response,
 ) -> BookId:
-    return await book_service.update_book(
-        book_id=book_id, book_update=book_update, partial=True
+    book = await book_service.update_book(
+        book_id=book_id, book_update=book_update, partial=True, version=version
     )
+    response.headers["ETag"] = entity_etag(book)
+    return book
 
 
 @router.delete(
@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic import BaseModel, ConfigDict, Field
 
 
@@ -28,3 +30,12 @@ class BookUpdatePartial(BaseModel):
 
 class BookId(BookBase):
     id: int
+    version: int
+    model_config = ConfigDict(from_attributes=True)
+
+
+class BookFilter(BaseModel):
+    author_id: int | None = None
+    year_from: int | None = None
+    year_to: int | None = None
+    sort: Literal["id", "-id", "year", "-year"] = "id"
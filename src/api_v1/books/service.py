@@ -1,29 +1,66 @@
 import logging
+from collections import Counter
+from typing import AsyncIterator, AsyncIterable, Iterable, Sequence
 
 from fastapi import HTTPException, status
-from fastapi_cache import FastAPICache
 
 from src.api_v1.books.repository import BooksRepository
+from src.core.cache import invalidate, cache_entity
 from src.core.mixins import ServiceMixin
 from src.core.config import settings
-from src.api_v1.books.repository import AuthorsRepository
+from src.core.schemas import Page, ImportResult
+from src.core.models import StatMetric
+from src.api_v1.authors.repository import AuthorsRepository
+from src.api_v1.stats.repository import StatsRepository
 from src.api_v1.books.schemas import *
 
 logger = logging.getLogger(__name__)
 
 
 class BooksService(ServiceMixin):
-    def __init__(self, books_repo: BooksRepository, authors_repo: AuthorsRepository):
+    def __init__(
+        self,
+        books_repo: BooksRepository,
+        authors_repo: AuthorsRepository,
+        stats_repo: StatsRepository,
+    ):
         self.authors_repo = authors_repo
         self.books_repo = books_repo
+        self.stats_repo = stats_repo
+
+    async def get_books(
+        self, cursor: str | None, limit: int, filters: BookFilter = BookFilter()
+    ) -> Page[BookId]:
+        logger.info("Get books page")
+        return await self.fetch_page(
+            self.books_repo,
+            BookId,
+            cursor,
+            limit,
+            sort=filters.sort,
+            where=self.books_repo.filter_clauses(
+                **filters.model_dump(exclude={"sort"})
+            ),
+        )
 
-    async def get_books(self) -> list[BookId]:
-        logger.info("Get all books")
-        books = await self.books_repo.get_all()
-        return [BookId.model_validate(x) for x in books]
+    async def search_books(
+        self, q: str, cursor: str | None, limit: int
+    ) -> Page[BookId]:
+        logger.info("Search books: %s", q)
+        offset = self.search_offset(cursor)
+        books = await self.books_repo.search(
+            q, offset=offset, limit=limit + 1, fuzzy=settings.search.fuzzy
+        )
+        return self.make_offset_page(books, offset, limit, BookId)
+
+    async def stream_books(self) -> AsyncIterator[bytes]:
+        logger.info("Stream all books")
+        batch_size = settings.db.stream_batch_size
+        async for book in self.books_repo.stream_all(batch_size):
+            yield BookId.model_validate(book).model_dump_json().encode() + b"\n"
 
     async def get_book(self, book_id: int) -> BookId:
-        logger.info(f"Get book %s", book_id)
+        logger.info("Get book %s", book_id)
 
         book = self.get_or_404(
             await self.books_repo.get_one(book_id), detail="Book not found"
@@ -41,22 +78,79 @@ class BooksService(ServiceMixin):
                 detail=f"Author with id {new_book.author_id} not found",
             )
 
-        book = await self.books_repo.create(new_book.model_dump())
+        book = BookId.model_validate(
+            await self.books_repo.create(new_book.model_dump(), commit=False)
+        )
+        await self._count_books(added=[(book.author_id, book.year)])
+        await self.books_repo.commit()
 
-        await FastAPICache.clear(namespace=settings.cache.namespace.books.books_list)
-        return BookId.model_validate(book)
+        namespace = settings.cache.namespace.books
+        await invalidate(*namespace.on_write, *self._author_keys(book.author_id))
+        await cache_entity(namespace.book, "book_id", book)
+        return book
+
+    async def create_books(self, new_books: list[BookCreate]) -> list[BookId]:
+        logger.info("Creating %s books", len(new_books))
+
+        author_ids = {x.author_id for x in new_books}
+        missing = author_ids - await self.authors_repo.get_existing_ids(author_ids)
+        if missing:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Authors with ids {sorted(missing)} not found",
+            )
+
+        books = await self.books_repo.create_many(
+            [x.model_dump() for x in new_books], commit=False
+        )
+        await self._count_books(added=[(x.author_id, x.year) for x in new_books])
+        await self.books_repo.commit()
+
+        await invalidate(
+            *settings.cache.namespace.books.on_write, *self._author_keys(*author_ids)
+        )
+        return [BookId.model_validate(x) for x in books]
+
+    def export_csv(self) -> AsyncIterator[bytes]:
+        logger.info("Export books to CSV")
+        return self.books_repo.export_csv()
+
+    async def import_csv(self, chunks: AsyncIterable[bytes]) -> ImportResult:
+        logger.info("Import books from CSV")
+
+        async def check_and_count(columns: Sequence[str]) -> None:
+            missing = await self.books_repo.staged_missing_author_ids()
+            if missing:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Authors with ids {missing} not found",
+                )
+            staging_table = self.books_repo.staging_table
+            await self.stats_repo.apply_staged(
+                StatMetric.BOOKS_PER_AUTHOR, staging_table, "author_id"
+            )
+            await self.stats_repo.apply_staged(
+                StatMetric.BOOKS_PER_YEAR, staging_table, "year"
+            )
+
+        imported = await self.load_csv(
+            self.books_repo, chunks, BookCreate, check_and_count
+        )
+
+        await invalidate(
+            *settings.cache.namespace.books.on_write,
+            settings.cache.namespace.authors.author,
+        )
+        return ImportResult(imported=imported)
 
     async def update_book(
         self,
         book_id: int,
         book_update: BookUpdate | BookUpdatePartial,
         partial: bool = False,
+        version: int | None = None,
     ) -> BookId:
 
-        book = self.get_or_404(
-            await self.books_repo.get_one(book_id), detail="Book not found"
-        )
-
         if book_update.author_id is not None:
             author = await self.authors_repo.get_one(book_update.author_id)
             if not author:
@@ -64,36 +158,80 @@ class BooksService(ServiceMixin):
 
         update_data = book_update.model_dump(exclude_unset=partial)
 
-        updated_book = await self.books_repo.update(
-            db_obj=book, update_data=update_data
+        updated = await self.books_repo.update_by_id_with_previous(
+            book_id, update_data, ("author_id", "year"), commit=False, version=version
+        )
+        if updated is None:
+            await self.check_version(self.books_repo, book_id, version)
+        updated_book, previous = self.get_or_404(updated, detail="Book not found")
+
+        book = BookId.model_validate(updated_book)
+        await self._count_books(
+            added=[(book.author_id, book.year)],
+            removed=[(previous["author_id"], previous["year"])],
         )
+        await self.books_repo.commit()
 
-        await FastAPICache.clear(namespace=settings.cache.namespace.books.books_list)
-        await FastAPICache.clear(
-            namespace=f"{settings.cache.namespace.books.book}:{book_id}"
+        namespace = settings.cache.namespace.books
+        await invalidate(
+            *namespace.on_write,
+            f"{namespace.book}:{book_id}",
+            *self._author_keys(*{previous["author_id"], book.author_id}),
         )
+        await cache_entity(namespace.book, "book_id", book)
 
-        return BookId.model_validate(updated_book)
+        return book
 
     async def delete_book(self, book_id: int) -> None:
-        logger.info(f"Deleting book %s", book_id)
+        logger.info("Deleting book %s", book_id)
 
         book = self.get_or_404(
-            await self.books_repo.get_one(book_id), detail="Book not found"
+            await self.books_repo.delete_by_id(book_id, commit=False),
+            detail="Book not found",
         )
-
-        await self.books_repo.delete(book)
-
-        await FastAPICache.clear(
-            namespace=settings.cache.namespace.books.books_list,
-        )
-        await FastAPICache.clear(
-            namespace=f"{settings.cache.namespace.books.book}:{book_id}"
+        await self._count_books(removed=[(book.author_id, book.year)])
+        await self.books_repo.commit()
+
+        namespace = settings.cache.namespace.books
+        await invalidate(
+            *namespace.on_write,
+            *namespace.on_delete,
+            f"{namespace.book}:{book_id}",
+            *self._author_keys(book.author_id),
         )
 
     async def delete_all_books(self):
-        logger.info(f"Delete all books")
+        logger.info("Delete all books")
 
-        await self.books_repo.delete_all_books()
+        await self.stats_repo.reset(
+            StatMetric.BOOKS_PER_AUTHOR, StatMetric.BOOKS_PER_YEAR
+        )
+        await self.books_repo.delete_all_books(commit=False)
+        await self.books_repo.commit()
+
+        namespace = settings.cache.namespace.books
+        await invalidate(
+            *namespace.on_write,
+            *namespace.on_delete,
+            namespace.book,
+            settings.cache.namespace.authors.author,
+        )
 
-        await FastAPICache.clear(namespace=settings.cache.namespace.books.books_list)
+    async def _count_books(
+        self,
+        added: Iterable[tuple[int, int]] = (),
+        removed: Iterable[tuple[int, int]] = (),
+    ) -> None:
+        """Apply ``(author_id, year)`` pairs of written books to the catalog stats."""
+        per_author, per_year = Counter(), Counter()
+        for books, sign in ((added, 1), (removed, -1)):
+            for author_id, year in books:
+                per_author[author_id] += sign
+                per_year[year] += sign
+        await self.stats_repo.apply(StatMetric.BOOKS_PER_AUTHOR, per_author)
+        await self.stats_repo.apply(StatMetric.BOOKS_PER_YEAR, per_year)
+
+    @staticmethod
+    def _author_keys(*author_ids: int) -> list[str]:
+        # Authors fetched with ?include=books embed their books
+        return [f"{settings.cache.namespace.authors.author}:{x}" for x in author_ids]
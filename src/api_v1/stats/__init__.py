@@ -0,0 +1,4 @@
+all = ["router"]
+
+
+from .router import router
@@ -0,0 +1,18 @@
+from fastapi import Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.api_v1.stats.repository import StatsRepository
+from src.api_v1.stats.service import StatsService
+from src.core.db import db_helper
+
+
+def get_stats_repository(
+    db: AsyncSession = Depends(db_helper.session_dependency),
+) -> StatsRepository:
+    return StatsRepository(db)
+
+
+def get_stats_service(
+    stats_repo: StatsRepository = Depends(get_stats_repository),
+) -> StatsService:
+    return StatsService(stats_repo)
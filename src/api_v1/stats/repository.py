@@ -0,0 +1,106 @@
+from typing import Mapping, Sequence
+
+from sqlalchemy import select, delete, func, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.base_repository import BaseRepository
+from src.core.models import BookModel, CatalogStatModel, StatMetric
+
+UNIQUE_METRIC_KEY = "uq_catalog_stats_metric_key"
+
+
+class StatsRepository(BaseRepository[CatalogStatModel]):
+    def __init__(self, db: AsyncSession):
+        super().__init__(model=CatalogStatModel, db=db)
+
+    async def apply(self, metric: StatMetric, deltas: Mapping[int, int]) -> None:
+        """Add ``deltas`` to the group totals of ``metric`` without committing.
+
+        Keys are upserted in order so concurrent writers lock rows in the
+        same order; groups that drop to zero are removed.
+        """
+        deltas = {k: v for k, v in sorted(deltas.items()) if v}
+        if not deltas:
+            return
+
+        stmt = insert(CatalogStatModel).values(
+            [{"metric": metric, "key": k, "total": v} for k, v in deltas.items()]
+        )
+        stmt = stmt.on_conflict_do_update(
+            constraint=UNIQUE_METRIC_KEY,
+            set_={"total": CatalogStatModel.total + stmt.excluded.total},
+        )
+        await self.db.execute(stmt)
+
+        if any(x < 0 for x in deltas.values()):
+            await self.db.execute(
+                delete(CatalogStatModel).where(
+                    CatalogStatModel.metric == metric, CatalogStatModel.total <= 0
+                )
+            )
+
+    async def apply_staged(
+        self, metric: StatMetric, staging_table: str, column: str
+    ) -> None:
+        """Count rows of a CSV staging table into ``metric`` grouped by ``column``."""
+        await self.db.execute(
+            text(
+                f"INSERT INTO {CatalogStatModel.__tablename__} (metric, key, total) "
+                f"SELECT :metric, {column}, count(*) FROM {staging_table} "
+                f"GROUP BY {column} ORDER BY {column} "
+                f"ON CONFLICT ON CONSTRAINT {UNIQUE_METRIC_KEY} "
+                f"DO UPDATE SET total = {CatalogStatModel.__tablename__}.total "
+                f"+ excluded.total"
+            ),
+            {"metric": metric},
+        )
+
+    async def remove_author_books(self, author_id: int) -> None:
+        """Drop the books of an author that is about to be deleted.
+
+        The caller must hold a lock on the author row, so no book can be
+        added between this count and the cascade.
+        """
+        stmt = (
+            select(BookModel.year, func.count())
+            .where(BookModel.author_id == author_id)
+            .group_by(BookModel.year)
+        )
+        years = (await self.db.execute(stmt)).all()
+        await self.apply(StatMetric.BOOKS_PER_YEAR, {x: -n for x, n in years})
+        await self.db.execute(
+            delete(CatalogStatModel).where(
+                CatalogStatModel.metric == StatMetric.BOOKS_PER_AUTHOR,
+                CatalogStatModel.key == author_id,
+            )
+        )
+
+    async def reset(self, *metrics: StatMetric) -> None:
+        await self.db.execute(
+            delete(CatalogStatModel).where(CatalogStatModel.metric.in_(metrics))
+        )
+
+    async def get_groups(
+        self, metric: StatMetric, by_total: bool = False, limit: int | None = None
+    ) -> Sequence[CatalogStatModel]:
+        order = (
+            (CatalogStatModel.total.desc(), CatalogStatModel.key)
+            if by_total
+            else (CatalogStatModel.key,)
+        )
+        stmt = (
+            select(CatalogStatModel)
+            .where(CatalogStatModel.metric == metric)
+            .order_by(*order)
+            .limit(limit)
+        )
+        result = await self.db.execute(stmt)
+        return result.scalars().all()
+
+    async def get_totals(self) -> dict[str, int]:
+        stmt = select(
+            CatalogStatModel.metric, func.sum(CatalogStatModel.total)
+        ).group_by(CatalogStatModel.metric)
+        result = await self.db.execute(stmt)
+        return {metric: int(total) for metric, total in result.all()}
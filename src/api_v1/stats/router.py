@@ -0,0 +1,79 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Query
+
+from src.core.cache import cache
+from src.core.utils import custom_key_builder
+from src.core.config import settings
+from .dependencies import get_stats_service
+from .schemas import AuthorBooksStat, YearBooksStat, AgeAuthorsStat, CatalogTotals
+from .service import StatsService
+
+router = APIRouter(prefix="/stats", tags=["Статистика"])
+
+
+@router.get(
+    "/totals",
+    summary="Кількість авторів і книг",
+    response_model=CatalogTotals,
+)
+@cache(
+    expire=settings.cache.expire,
+    namespace=settings.cache.namespace.stats.totals,
+    key_builder=custom_key_builder,
+)
+async def get_totals(
+    stats_service: Annotated[StatsService, Depends(get_stats_service)],
+) -> CatalogTotals:
+    return await stats_service.totals()
+
+
+@router.get(
+    "/books-per-author",
+    summary="Автори з найбільшою кількістю книг",
+    response_model=list[AuthorBooksStat],
+)
+@cache(
+    expire=settings.cache.expire,
+    namespace=settings.cache.namespace.stats.books_per_author,
+    key_builder=custom_key_builder,
+)
+async def get_books_per_author(
+    stats_service: Annotated[StatsService, Depends(get_stats_service)],
+    limit: Annotated[
+        int, Query(ge=1, le=settings.pagination.max_limit)
+    ] = settings.pagination.default_limit,
+) -> list[AuthorBooksStat]:
+    return await stats_service.books_per_author(limit)
+
+
+@router.get(
+    "/books-per-year",
+    summary="Кількість книг за роками",
+    response_model=list[YearBooksStat],
+)
+@cache(
+    expire=settings.cache.expire,
+    namespace=settings.cache.namespace.stats.books_per_year,
+    key_builder=custom_key_builder,
+)
+async def get_books_per_year(
+    stats_service: Annotated[StatsService, Depends(get_stats_service)],
+) -> list[YearBooksStat]:
+    return await stats_service.books_per_year()
+
+
+@router.get(
+    "/authors-per-age",
+    summary="Розподіл авторів за віком",
+    response_model=list[AgeAuthorsStat],
+)
+@cache(
+    expire=settings.cache.expire,
+    namespace=settings.cache.namespace.stats.authors_per_age,
+    key_builder=custom_key_builder,
+)
+async def get_authors_per_age(
+    stats_service: Annotated[StatsService, Depends(get_stats_service)],
+) -> list[AgeAuthorsStat]:
+    return await stats_service.authors_per_age()
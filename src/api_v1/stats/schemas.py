@@ -0,0 +1,21 @@
+from pydantic import BaseModel
+
+
+class AuthorBooksStat(BaseModel):
+    author_id: int
+    books: int
+
+
+class YearBooksStat(BaseModel):
+    year: int
+    books: int
+
+
+class AgeAuthorsStat(BaseModel):
+    age: int
+    authors: int
+
+
+class CatalogTotals(BaseModel):
+    authors: int
+    books: int
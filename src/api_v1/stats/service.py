@@ -0,0 +1,37 @@
+import logging
+
+from src.core.models import StatMetric
+from src.api_v1.stats.repository import StatsRepository
+from src.api_v1.stats.schemas import *
+
+logger = logging.getLogger(__name__)
+
+
+class StatsService:
+    def __init__(self, stats_repo: StatsRepository):
+        self.stats_repo = stats_repo
+
+    async def books_per_author(self, limit: int) -> list[AuthorBooksStat]:
+        logger.info("Get books per author")
+        groups = await self.stats_repo.get_groups(
+            StatMetric.BOOKS_PER_AUTHOR, by_total=True, limit=limit
+        )
+        return [AuthorBooksStat(author_id=x.key, books=x.total) for x in groups]
+
+    async def books_per_year(self) -> list[YearBooksStat]:
+        logger.info("Get books per year")
+        groups = await self.stats_repo.get_groups(StatMetric.BOOKS_PER_YEAR)
+        return [YearBooksStat(year=x.key, books=x.total) for x in groups]
+
+    async def authors_per_age(self) -> list[AgeAuthorsStat]:
+        logger.info("Get authors per age")
+        groups = await self.stats_repo.get_groups(StatMetric.AUTHORS_PER_AGE)
+        return [AgeAuthorsStat(age=x.key, authors=x.total) for x in groups]
+
+    async def totals(self) -> CatalogTotals:
+        logger.info("Get catalog totals")
+        totals = await self.stats_repo.get_totals()
+        return CatalogTotals(
+            authors=totals.get(StatMetric.AUTHORS_PER_AGE, 0),
+            books=totals.get(StatMetric.BOOKS_PER_YEAR, 0),
+        )
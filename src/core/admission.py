@@ -0,0 +1,172 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from contextvars import ContextVar
+
+from fastapi import HTTPException, Request, status
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from src.core.config import AdmissionConfig, settings
+from src.core.metrics import ADMISSION_REJECTIONS
+
+logger = logging.getLogger(__name__)
+
+
+class Overloaded(Exception):
+    pass
+
+
+class Limiter:
+    """At most ``limit`` holders at once, the next ``queue_size`` callers wait.
+
+    Slots are handed to waiters in arrival order on release. Callers beyond
+    the queue, or still waiting at their deadline, get ``Overloaded``.
+    """
+
+    def __init__(self, limit: int, queue_size: int):
+        self.limit = limit
+        self.queue_size = queue_size
+        self.active = 0
+        self._waiters: deque[asyncio.Future] = deque()
+
+    async def acquire(self, timeout: float) -> None:
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            return
+        if len(self._waiters) >= self.queue_size:
+            raise Overloaded("queue full")
+        if timeout <= 0:
+            raise Overloaded("timed out")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, timeout)
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # Handed a slot just as we gave up, pass it on
+                self.release()
+            else:
+                self._waiters.remove(waiter)
+            if isinstance(e, asyncio.TimeoutError):
+                raise Overloaded("timed out") from None
+            raise
+
+    def release(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+
+class AdmissionControl:
+    """Limits on requests that reach the database.
+
+    One limiter for all routes, sized to the primary's pool unless
+    ``config.limit`` is set, and one per route listed in
+    ``config.route_limits``.
+    """
+
+    def __init__(self, config: AdmissionConfig, pool_capacity: int):
+        self.config = config
+        self.limiter = Limiter(config.limit or pool_capacity, config.queue_size)
+        self.route_limiters = {
+            route: Limiter(limit, config.route_queue_size)
+            for route, limit in config.route_limits.items()
+        }
+
+    def reject(self, route: str, status_code: int, reason: str) -> HTTPException:
+        logger.warning("Shedding %s: %s", route, reason)
+        if settings.metrics.enabled:
+            ADMISSION_REJECTIONS.labels(route, reason).inc()
+        return HTTPException(
+            status_code=status_code,
+            detail="Server is busy, try again later",
+            headers={"Retry-After": str(self.config.retry_after)},
+        )
+
+    async def admit(self, route: str) -> list[Limiter]:
+        """Take a slot of ``route`` then one of the database, within one deadline.
+
+        A busy route is answered with 429, a saturated database with 503.
+        """
+        deadline = time.monotonic() + self.config.timeout
+        held = []
+        steps = [
+            (self.route_limiters.get(route), status.HTTP_429_TOO_MANY_REQUESTS),
+            (self.limiter, status.HTTP_503_SERVICE_UNAVAILABLE),
+        ]
+        for limiter, status_code in steps:
+            if limiter is None:
+                continue
+            try:
+                await limiter.acquire(deadline - time.monotonic())
+            except Overloaded as e:
+                for x in held:
+                    x.release()
+                raise self.reject(route, status_code, str(e)) from None
+            held.append(limiter)
+        return held
+
+
+class Ticket:
+    def __init__(self, control: AdmissionControl):
+        self.control = control
+        self.held: list[Limiter] | None = None
+
+    def release(self) -> None:
+        for limiter in self.held or ():
+            limiter.release()
+        self.held = None
+
+
+_ticket: ContextVar[Ticket | None] = ContextVar("admission_ticket", default=None)
+
+
+def route_name(request: Request) -> str:
+    route = request.scope.get("route")
+    return f"{request.method} {getattr(route, 'path', request.url.path)}"
+
+
+def is_cached(request: Request) -> bool:
+    route = request.scope.get("route")
+    return getattr(getattr(route, "endpoint", None), "cached", False)
+
+
+async def admit(request: Request, cache_miss: bool = False) -> None:
+    """Wait for this request's slots before it uses the database.
+
+    Runs once per request and the slots are held until the response is
+    sent. Routes decorated with ``@cache`` are only admitted on a miss, so
+    cache hits are served however busy the database is.
+    """
+    ticket = _ticket.get()
+    if ticket is None or ticket.held is not None:
+        return
+    if is_cached(request) and not cache_miss:
+        return
+    ticket.held = await ticket.control.admit(route_name(request))
+
+
+class AdmissionMiddleware:
+    """Scope admission (see ``admit``) to a request and release its slots."""
+
+    def __init__(self, app: ASGIApp, config: AdmissionConfig, pool_capacity: int):
+        self.app = app
+        self.control = AdmissionControl(config, pool_capacity)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        ticket = Ticket(self.control)
+        token = _ticket.set(ticket)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _ticket.reset(token)
+            ticket.release()
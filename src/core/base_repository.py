@@ -1,6 +1,31 @@
-from typing import TypeVar, Generic, Sequence
+import asyncio
+import re
+from typing import (
+    Any,
+    TypeVar,
+    Generic,
+    Sequence,
+    AsyncIterator,
+    Iterable,
+    AsyncIterable,
+)
 
-from sqlalchemy import select
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import (
+    select,
+    insert,
+    update,
+    delete,
+    any_,
+    or_,
+    bindparam,
+    text,
+    func,
+    tuple_,
+    Column,
+)
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.dialects.postgresql import ARRAY, INTEGER
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.core.models import Base
@@ -10,37 +35,355 @@ T = TypeVar("T", bound=Base)
 
 class BaseRepository(Generic[T]):
     model: type[T]
+    # Columns matched with pg_trgm by ``search``
+    fuzzy_columns: tuple[str, ...] = ()
 
     def __init__(self, model: type[T], db: AsyncSession):
         self.model = model
         self.db = db
 
-    async def get_one(self, obj_id: int) -> T:
-        obj = await self.db.get(self.model, obj_id)
+    async def get_one(
+        self, obj_id: int, options: Sequence = (), for_update: bool = False
+    ) -> T:
+        # populate_existing so the options apply to an already loaded object
+        obj = await self.db.get(
+            self.model,
+            obj_id,
+            options=options,
+            populate_existing=bool(options) or for_update,
+            with_for_update=for_update,
+        )
         return obj
 
-    async def get_all(self) -> Sequence[T]:
-        stmt = select(self.model).order_by(self.model.id)
+    async def get_existing_ids(self, ids: Iterable[int]) -> set[int]:
+        ids_param = bindparam("ids", list(ids), type_=ARRAY(INTEGER))
+        stmt = select(self.model.id).where(self.model.id == any_(ids_param))
+        result = await self.db.execute(stmt)
+        return set(result.scalars().all())
+
+    async def get_page(
+        self,
+        after_id: int | None = None,
+        limit: int = 50,
+        options: Sequence = (),
+        where: Sequence = (),
+        sort: str = "id",
+        after_key: Any = None,
+    ) -> Sequence[T]:
+        """Keyset page ordered by ``sort`` (``-`` prefix for descending), ties
+        broken by id; ``after_key`` is the sort value of the previous last row."""
+        descending = sort.startswith("-")
+        name = sort.removeprefix("-")
+        keys = [self.model.id]
+        after = [after_id]
+        if name != "id":
+            keys.insert(0, getattr(self.model, name))
+            after.insert(0, after_key)
+
+        stmt = (
+            select(self.model)
+            .options(*options)
+            .where(*where)
+            .order_by(*(x.desc() if descending else x for x in keys))
+            .limit(limit)
+        )
+        if after_id is not None:
+            position = tuple_(*keys) if len(keys) > 1 else keys[0]
+            last = tuple_(*after) if len(after) > 1 else after[0]
+            stmt = stmt.where(position < last if descending else position > last)
+
         result = await self.db.execute(stmt)
         return result.scalars().all()
 
-    async def create(self, data: dict) -> T:
-        dt_obj = self.model(**data)
+    def sort_key_type(self, sort: str) -> type:
+        return self.model.__table__.c[sort.removeprefix("-")].type.python_type
 
-        self.db.add(dt_obj)
-        await self.db.commit()
-        await self.db.refresh(dt_obj)
+    async def search(
+        self, q: str, offset: int = 0, limit: int = 50, fuzzy: bool = True
+    ) -> Sequence[T]:
+        """Rank rows by ``search_vector`` prefix matches, plus trigram
+        similarity on ``fuzzy_columns`` to tolerate typos."""
+        terms = re.findall(r"\w+", q)
+        if not terms:
+            return []
+
+        tsquery = func.to_tsquery("simple", " & ".join(f"{x}:*" for x in terms))
+        matches = [self.model.search_vector.op("@@")(tsquery)]
+        rank = func.ts_rank(self.model.search_vector, tsquery)
+        if fuzzy and self.fuzzy_columns:
+            columns = [getattr(self.model, x) for x in self.fuzzy_columns]
+            matches += [x.op("%")(q) for x in columns]
+            rank += func.greatest(*(func.similarity(x, q) for x in columns))
+
+        stmt = (
+            select(self.model)
+            .where(or_(*matches))
+            .order_by(rank.desc(), self.model.id)
+            .offset(offset)
+            .limit(limit)
+        )
+        result = await self.db.execute(stmt)
+        return result.scalars().all()
+
+    async def stream_all(self, batch_size: int) -> AsyncIterator[T]:
+        stmt = (
+            select(self.model)
+            .order_by(self.model.id)
+            .execution_options(yield_per=batch_size)
+        )
+        result = await self.db.stream_scalars(stmt)
+        async for obj in result:
+            yield obj
+
+    async def create(self, data: dict, commit: bool = True) -> T:
+        # INSERT ... RETURNING instead of add + commit + refresh SELECT
+        stmt = insert(self.model).values(**data).returning(self.model)
+        dt_obj = await self.db.scalar(stmt)
+        if commit:
+            await self.db.commit()
         return dt_obj
 
-    async def update(self, db_obj: T, update_data: dict) -> T:
-        for key, value in update_data.items():
-            setattr(db_obj, key, value)
+    async def create_many(self, data: list[dict], commit: bool = True) -> Sequence[T]:
+        stmt = insert(self.model).returning(self.model, sort_by_parameter_order=True)
+        result = await self.db.scalars(stmt, data)
+        objs = result.all()
+        if commit:
+            await self.db.commit()
+        return objs
 
-        self.db.add(db_obj)
-        await self.db.commit()
-        await self.db.refresh(db_obj)
+    async def update_by_id(
+        self,
+        obj_id: int,
+        update_data: dict,
+        commit: bool = True,
+        version: int | None = None,
+    ) -> T | None:
+        """Update a row with a single ``UPDATE ... RETURNING``.
+
+        With ``version`` the row is only updated while it still has that
+        version. Returns ``None`` when there is no such row.
+        """
+        if not update_data:
+            db_obj = await self.get_one(obj_id)
+            if db_obj is None or version not in (None, db_obj.version):
+                return None
+            return db_obj
+
+        stmt = (
+            update(self.model)
+            .where(self.model.id == obj_id, *self._version_clause(version))
+            .values(**update_data, version=self.model.version + 1)
+            .returning(self.model)
+            .execution_options(populate_existing=True)
+        )
+        db_obj = await self.db.scalar(stmt)
+        if commit:
+            await self.db.commit()
         return db_obj
 
-    async def delete(self, dt_obj: T) -> None:
-        await self.db.delete(dt_obj)
+    async def update_by_id_with_previous(
+        self,
+        obj_id: int,
+        update_data: dict,
+        columns: Sequence[str],
+        commit: bool = True,
+        version: int | None = None,
+    ) -> tuple[T, dict] | None:
+        """Like ``update_by_id``, also returning the old values of ``columns``.
+
+        The old row is locked and read in the same statement:
+        ``UPDATE ... FROM (SELECT ... FOR UPDATE) RETURNING``.
+        """
+        if not update_data:
+            db_obj = await self.update_by_id(obj_id, update_data, version=version)
+            if db_obj is None:
+                return None
+            return db_obj, {x: getattr(db_obj, x) for x in columns}
+
+        previous = (
+            select(self.model.id, *(getattr(self.model, x) for x in columns))
+            .where(self.model.id == obj_id, *self._version_clause(version))
+            .with_for_update()
+            .subquery("previous")
+        )
+        stmt = (
+            update(self.model)
+            .where(self.model.id == previous.c.id)
+            .values(**update_data, version=self.model.version + 1)
+            .returning(self.model, *(previous.c[x] for x in columns))
+            .execution_options(populate_existing=True)
+        )
+        row = (await self.db.execute(stmt)).first()
+        if commit:
+            await self.db.commit()
+        if row is None:
+            return None
+        return row[0], dict(zip(columns, row[1:]))
+
+    def _version_clause(self, version: int | None) -> tuple:
+        # Re-checked after a concurrent update releases the row, so a
+        # stale version never overwrites a newer one
+        return () if version is None else (self.model.version == version,)
+
+    async def delete_by_id(self, obj_id: int, commit: bool = True) -> T | None:
+        """Delete a row with a single ``DELETE ... RETURNING``.
+
+        Returns the deleted row, or ``None`` when there is no row with this id.
+        """
+        stmt = delete(self.model).where(self.model.id == obj_id).returning(self.model)
+        dt_obj = await self.db.scalar(stmt)
+        if commit:
+            await self.db.commit()
+        return dt_obj
+
+    async def commit(self) -> None:
         await self.db.commit()
+
+    @property
+    def staging_table(self) -> str:
+        return f"import_{self.model.__tablename__}"
+
+    @property
+    def data_columns(self) -> list[Column]:
+        """Table columns without generated ones, which COPY can't load,
+        and without the row version, which only updates set."""
+        version = self.model.__mapper__.version_id_col
+        return [
+            x for x in self.model.__table__.c if x.computed is None and x is not version
+        ]
+
+    def parse_csv_row(
+        self, columns: Sequence[str], row: Sequence[str], schema: type[BaseModel]
+    ) -> tuple:
+        """Validate a row of raw CSV strings against ``schema`` and convert it
+        into the Python types binary COPY expects.
+
+        Columns ``schema`` has no field for (``id``) are only cast.
+        """
+        if len(row) != len(columns):
+            raise ValueError(f"Expected {len(columns)} values, got {len(row)}")
+
+        values = {}
+        for name, raw in zip(columns, row):
+            column = self.model.__table__.c[name]
+            values[name] = None if raw == "" and column.nullable else raw
+        fields = {k: v for k, v in values.items() if k in schema.model_fields}
+        try:
+            validated = schema.model_validate(fields)
+        except ValidationError as e:
+            errors = "; ".join(
+                f"{'.'.join(map(str, x['loc']))}: {x['msg']}" for x in e.errors()
+            )
+            raise ValueError(errors) from None
+
+        return tuple(
+            (
+                getattr(validated, name)
+                if name in fields
+                else self.cast_csv_value(name, values[name])
+            )
+            for name in columns
+        )
+
+    def cast_csv_value(self, name: str, raw: str | None) -> Any:
+        if raw is None:
+            return None
+        return self.model.__table__.c[name].type.python_type(raw)
+
+    def check_csv_columns(self, columns: Sequence[str]) -> None:
+        unknown = set(columns) - {x.name for x in self.data_columns}
+        if unknown:
+            raise ValueError(f"Unknown columns: {sorted(unknown)}")
+        required = {
+            x.name
+            for x in self.data_columns
+            if not x.nullable
+            and not x.primary_key
+            and x.default is None
+            and x.server_default is None
+        }
+        missing = required - set(columns)
+        if missing:
+            raise ValueError(f"Missing columns: {sorted(missing)}")
+
+    async def _driver_connection(self):
+        conn = await self.db.connection()
+        raw = await conn.get_raw_connection()
+        return raw.driver_connection
+
+    async def export_csv(self) -> AsyncIterator[bytes]:
+        """Stream the whole table as CSV through ``COPY ... TO STDOUT``.
+
+        asyncpg pushes chunks into a bounded queue, so a slow client
+        throttles the COPY instead of the table being buffered in memory.
+        """
+        table = self.model.__table__
+        stmt = select(*self.data_columns).order_by(table.c.id)
+        query = str(stmt.compile(dialect=postgresql.dialect()))
+
+        conn = await self._driver_connection()
+        chunks: asyncio.Queue[bytes | None] = asyncio.Queue(maxsize=16)
+
+        async def write(chunk: bytearray) -> None:
+            await chunks.put(bytes(chunk))
+
+        async def copy() -> None:
+            try:
+                await conn.copy_from_query(
+                    query, output=write, format="csv", header=True
+                )
+            finally:
+                await chunks.put(None)
+
+        task = asyncio.create_task(copy())
+        try:
+            while (chunk := await chunks.get()) is not None:
+                yield chunk
+            await task
+        finally:
+            task.cancel()
+
+    async def stage_records(
+        self, columns: Sequence[str], records: AsyncIterable[tuple]
+    ) -> None:
+        """Load records into a temporary table with binary COPY.
+
+        The staging table only has the imported columns and no constraints
+        or defaults; they are applied once by ``merge_staged``. It lives until
+        the end of the transaction, so the caller has to ``merge_staged`` or
+        ``rollback`` afterwards.
+        """
+        column_list = ", ".join(columns)
+        await self.db.execute(
+            text(
+                f"CREATE TEMP TABLE {self.staging_table} ON COMMIT DROP AS "
+                f"SELECT {column_list} FROM {self.model.__tablename__} WITH NO DATA"
+            )
+        )
+        conn = await self._driver_connection()
+        await conn.copy_records_to_table(
+            self.staging_table, records=records, columns=list(columns)
+        )
+
+    async def merge_staged(self, columns: Sequence[str]) -> int:
+        table = self.model.__tablename__
+        column_list = ", ".join(columns)
+
+        result = await self.db.execute(
+            text(
+                f"INSERT INTO {table} ({column_list}) "
+                f"SELECT {column_list} FROM {self.staging_table}"
+            )
+        )
+        if "id" in columns:
+            await self.db.execute(
+                text(
+                    f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                    f"coalesce(max(id), 0) + 1, false) FROM {table}"
+                )
+            )
+        await self.db.commit()
+        return result.rowcount
+
+    async def rollback(self) -> None:
+        await self.db.rollback()
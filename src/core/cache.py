@@ -0,0 +1,632 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from functools import wraps
+from inspect import Parameter
+from typing import Optional, Tuple, Callable, Awaitable, Any, AsyncIterator
+
+from fastapi.dependencies.utils import get_typed_signature, get_typed_return_annotation
+import msgpack
+import orjson
+import zstandard
+from fastapi.responses import JSONResponse
+from fastapi_cache import FastAPICache, Coder
+from fastapi_cache.types import Backend, KeyBuilder
+from pydantic import BaseModel
+from pydantic_core import to_jsonable_python
+from redis.asyncio import Redis
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.status import HTTP_304_NOT_MODIFIED
+
+from src.core.admission import admit
+from src.core.compression import cached_variant, negotiate, weak_etag
+from src.core.config import settings, CacheCoderConfig
+from src.core.db import db_helper
+from src.core.metrics import (
+    CACHE_INVALIDATIONS,
+    CACHE_REQUESTS,
+    cache_namespace_label,
+)
+from src.core.responses import JSONBytesResponse
+
+logger = logging.getLogger(__name__)
+
+
+class ORJSONCoder(Coder):
+    """Stores response bodies as they are and hands them back as responses,
+    so a cache hit never decodes or re-encodes JSON."""
+
+    @classmethod
+    def encode(cls, value: Any) -> bytes:
+        if isinstance(value, JSONResponse):
+            return value.body
+        if isinstance(value, BaseModel):
+            return value.__pydantic_serializer__.to_json(value)
+        return orjson.dumps(value, default=to_jsonable_python)
+
+    @classmethod
+    def decode(cls, value: bytes) -> Any:
+        return orjson.loads(value)
+
+    @classmethod
+    def decode_as_type(cls, value: bytes, *, type_: Any) -> Any:
+        return JSONBytesResponse(value)
+
+
+class MsgPackCoder(ORJSONCoder):
+    """Stores response bodies as MessagePack, which is more compact than
+    JSON; a cache hit decodes it and encodes the JSON body again."""
+
+    @classmethod
+    def encode(cls, value: Any) -> bytes:
+        if isinstance(value, JSONResponse):
+            value = orjson.loads(value.body)
+        return msgpack.packb(value, default=to_jsonable_python)
+
+    @classmethod
+    def decode(cls, value: bytes) -> Any:
+        return msgpack.unpackb(value)
+
+    @classmethod
+    def decode_as_type(cls, value: bytes, *, type_: Any) -> Any:
+        return JSONBytesResponse(orjson.dumps(cls.decode(value)))
+
+
+# Starts every zstd frame; JSON and MessagePack objects and arrays never do
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+def zstd_coder(coder: type[Coder], level: int, minimum_size: int) -> type[Coder]:
+    """``coder`` with the values of at least ``minimum_size`` bytes zstd
+    compressed. Smaller values are stored as ``coder`` encodes them."""
+    compressor = zstandard.ZstdCompressor(level=level)
+    decompressor = zstandard.ZstdDecompressor()
+
+    def decompress(value: bytes) -> bytes:
+        if value.startswith(ZSTD_MAGIC):
+            return decompressor.decompress(value)
+        return value
+
+    class ZstdCoder(coder):
+        @classmethod
+        def encode(cls, value: Any) -> bytes:
+            data = super().encode(value)
+            if len(data) < minimum_size:
+                return data
+            return compressor.compress(data)
+
+        @classmethod
+        def decode(cls, value: bytes) -> Any:
+            return super().decode(decompress(value))
+
+        @classmethod
+        def decode_as_type(cls, value: bytes, *, type_: Any) -> Any:
+            return super().decode_as_type(decompress(value), type_=type_)
+
+    ZstdCoder.__name__ = f"Zstd{coder.__name__}"
+    return ZstdCoder
+
+
+CODERS: dict[str, type[Coder]] = {"orjson": ORJSONCoder, "msgpack": MsgPackCoder}
+
+
+def make_coder(config: CacheCoderConfig) -> type[Coder]:
+    coder = CODERS[config.format]
+    if config.zstd.enabled:
+        coder = zstd_coder(coder, config.zstd.level, config.zstd.minimum_size)
+    return coder
+
+
+class L1Cache:
+    """In-process LRU cache bounded by entry count and total bytes.
+
+    Not thread safe, it is only touched from the event loop and never
+    awaits in the middle of an operation.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.size = 0
+        self._entries: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Tuple[int, bytes]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        ttl = expires_at - time.monotonic()
+        if ttl <= 0:
+            self.drop(key)
+            return None
+
+        self._entries.move_to_end(key)
+        return int(ttl), value
+
+    def set(self, key: str, value: bytes, expire: Optional[int] = None) -> None:
+        ttl = min(self.ttl, expire) if expire and expire > 0 else self.ttl
+        entry_size = len(key) + len(value)
+        if ttl <= 0 or entry_size > self.max_bytes:
+            return
+
+        self.drop(key)
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self.size += entry_size
+
+        while len(self._entries) > self.max_entries or self.size > self.max_bytes:
+            old_key, (_, old_value) = self._entries.popitem(last=False)
+            self.size -= len(old_key) + len(old_value)
+
+    def drop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(key) + len(entry[1])
+
+    def drop_namespace(self, namespace: str) -> None:
+        for key in [k for k in self._entries if k.startswith(f"{namespace}:")]:
+            self.drop(key)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.size = 0
+
+
+class TwoTierBackend(Backend):
+    """fastapi-cache backend that puts an ``L1Cache`` in front of another one.
+
+    Invalidations are applied locally and published on a Redis channel, so
+    every worker running ``listen`` drops the same L1 entries.
+    """
+
+    def __init__(self, backend: Backend, redis: Redis, l1: L1Cache, channel: str):
+        self.backend = backend
+        self.redis = redis
+        self.l1 = l1
+        self.channel = channel
+        self.origin = uuid.uuid4().hex
+
+    async def get_with_ttl(self, key: str) -> Tuple[int, Optional[bytes]]:
+        cached = self.l1.get(key)
+        if cached is not None:
+            return cached
+
+        ttl, value = await self.backend.get_with_ttl(key)
+        if value is not None:
+            self.l1.set(key, value, ttl)
+        return ttl, value
+
+    async def get(self, key: str) -> Optional[bytes]:
+        _, value = await self.get_with_ttl(key)
+        return value
+
+    async def set(self, key: str, value: bytes, expire: Optional[int] = None) -> None:
+        await self.backend.set(key, value, expire)
+        self.l1.set(key, value, expire)
+
+    async def clear(
+        self, namespace: Optional[str] = None, key: Optional[str] = None
+    ) -> int:
+        message = {"origin": self.origin, "namespace": namespace, "key": key}
+        self._invalidate(message)
+
+        count = await self.backend.clear(namespace, key)
+        await self.redis.publish(self.channel, json.dumps(message))
+        return count
+
+    def _invalidate(self, message: dict) -> None:
+        if message.get("generations"):
+            generations.apply(message["generations"])
+        elif message.get("namespace"):
+            self.l1.drop_namespace(message["namespace"])
+        elif message.get("key"):
+            self.l1.drop(message["key"])
+
+    async def listen(self, retry_delay: float = 1.0) -> None:
+        """Apply invalidations published by other workers until cancelled."""
+        while True:
+            try:
+                async with self.redis.pubsub(ignore_subscribe_messages=True) as pubsub:
+                    await pubsub.subscribe(self.channel)
+                    async for message in pubsub.listen():
+                        data = json.loads(message["data"])
+                        if data.get("origin") != self.origin:
+                            self._invalidate(data)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.warning("Cache invalidation listener failed", exc_info=True)
+                # Messages may have been missed while disconnected
+                self.l1.clear()
+                generations.clear()
+                await asyncio.sleep(retry_delay)
+
+
+class CacheGenerations:
+    """Generation counters that ``custom_key_builder`` embeds in cache keys.
+
+    Invalidating a namespace is one ``INCR`` of its counter: new requests
+    build keys with the new generation and the old entries expire by TTL.
+    Workers keep the counters locally for ``local_ttl`` seconds and get
+    bumps from other workers over the invalidation channel. Without Redis
+    (tests) the counters are process local.
+    """
+
+    def __init__(self, max_entries: int = 100_000):
+        self.max_entries = max_entries
+        self.redis: Optional[Redis] = None
+        self.channel: Optional[str] = None
+        self.origin: Optional[str] = None
+        self._local: OrderedDict[str, tuple[float, int]] = OrderedDict()
+
+    def bind(self, redis: Redis, channel: str, origin: str) -> None:
+        self.redis = redis
+        self.channel = channel
+        self.origin = origin
+
+    @staticmethod
+    def _key(name: str) -> str:
+        return f"gen:{name}"
+
+    def _remember(self, name: str, value: int) -> None:
+        self._local[name] = (time.monotonic(), value)
+        self._local.move_to_end(name)
+        while len(self._local) > self.max_entries:
+            self._local.popitem(last=False)
+
+    async def get(self, name: str) -> int:
+        entry = self._local.get(name)
+        local_ttl = settings.cache.generations.local_ttl
+        if entry is not None and (
+            self.redis is None or time.monotonic() - entry[0] < local_ttl
+        ):
+            return entry[1]
+
+        value = 0
+        if self.redis is not None:
+            value = int(await self.redis.get(self._key(name)) or 0)
+        self._remember(name, value)
+        return value
+
+    async def bump(self, *names: str) -> None:
+        if self.redis is None:
+            for name in names:
+                self._remember(name, await self.get(name) + 1)
+            return
+
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for name in names:
+                pipe.incr(self._key(name))
+                pipe.expire(self._key(name), settings.cache.generations.ttl)
+            values = (await pipe.execute())[::2]
+
+        bumped = dict(zip(names, values))
+        self.apply(bumped)
+        await self.redis.publish(
+            self.channel, json.dumps({"origin": self.origin, "generations": bumped})
+        )
+
+    def apply(self, generations: dict[str, int]) -> None:
+        for name, value in generations.items():
+            entry = self._local.get(name)
+            if entry is None or entry[1] < value:
+                self._remember(name, value)
+
+    def clear(self) -> None:
+        self._local.clear()
+
+
+generations = CacheGenerations()
+
+
+async def make_cache_key(
+    namespace: str, params: dict, element_id: Optional[Any] = None
+) -> str:
+    """Compose a cache key from a prefixed namespace and endpoint params."""
+    raw_key = f"{namespace}:{sorted(params.items())}"
+    hash_part = hashlib.md5(raw_key.encode()).hexdigest()
+    generation = await generations.get(namespace)
+    if element_id is not None:
+        element_generation = await generations.get(f"{namespace}:{element_id}")
+        return f"{namespace}:{element_id}:{generation}.{element_generation}:{hash_part}"
+
+    return f"{namespace}:{generation}:{hash_part}"
+
+
+def entity_etag(entity: Any) -> str:
+    """Strong ETag of a row, its ``version`` changes on every update."""
+    return f'"{entity.version}"'
+
+
+def content_etag(payload: bytes) -> str:
+    return f'W/"{hashlib.md5(payload).hexdigest()}"'
+
+
+def etag_matches(header: str, etag: str) -> bool:
+    """Weak comparison of ``If-None-Match`` against ``etag``."""
+    if header.strip() == "*":
+        return True
+    etag = etag.removeprefix("W/")
+    return any(x.strip().removeprefix("W/") == etag for x in header.split(","))
+
+
+def pack_entry(etag: str, payload: bytes) -> bytes:
+    """Cache entries carry their ETag, so a 304 needs no hashing or decoding."""
+    return etag.encode() + b"\n" + payload
+
+
+def unpack_entry(value: bytes) -> tuple[str, bytes]:
+    etag, _, payload = value.partition(b"\n")
+    return etag.decode(), payload
+
+
+async def cache_entity(namespace: str, id_param: str, entity: Any) -> None:
+    """Store ``entity`` under the key its single-entity GET route reads.
+
+    Call it after ``invalidate`` so the value lands in the new generation.
+    """
+    key = await make_cache_key(
+        f"{FastAPICache.get_prefix()}:{namespace}", {id_param: entity.id}, entity.id
+    )
+    try:
+        payload = FastAPICache.get_coder().encode(entity)
+        value = pack_entry(entity_etag(entity), payload)
+        await FastAPICache.get_backend().set(key, value, settings.cache.expire)
+    except Exception:
+        logger.warning("Error setting cache key '%s'", key, exc_info=True)
+
+
+async def invalidate(*namespaces: str) -> None:
+    """Bump the generation of each namespace (``author``, ``author:42``...)."""
+    prefix = FastAPICache.get_prefix()
+    names = dict.fromkeys(namespaces)
+    await generations.bump(*(f"{prefix}:{x}" for x in names))
+    if settings.metrics.enabled:
+        for name in names:
+            CACHE_INVALIDATIONS.labels(cache_namespace_label(name)).inc()
+
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key into one execution.
+
+    Callers that arrive while a call for their key is running await its
+    outcome (result or exception) instead of running it again.
+    """
+
+    def __init__(self):
+        self._calls: dict[str, asyncio.Future] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        while (call := self._calls.get(key)) is not None:
+            try:
+                return await asyncio.shield(call)
+            except asyncio.CancelledError:
+                # The leader was cancelled (client went away), take over
+                if not call.cancelled():
+                    raise
+
+        call = asyncio.get_running_loop().create_future()
+        call.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._calls[key] = call
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            call.cancel()
+            raise
+        except BaseException as e:
+            call.set_exception(e)
+            raise
+        else:
+            call.set_result(result)
+            return result
+        finally:
+            del self._calls[key]
+
+
+single_flight = SingleFlight()
+
+
+# Deletes the lock only while it still holds our token: a holder that ran
+# past the timeout must not release the lock the next worker acquired
+RELEASE_LOCK = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+@asynccontextmanager
+async def peer_lock(backend: Backend, key: str) -> AsyncIterator[Optional[bytes]]:
+    """Hold a short Redis lock for ``key`` or wait for its holder's result.
+
+    Yields the value another process stored while we waited, or ``None``
+    when this process should compute it itself (lock acquired, holder gave
+    up or timed out, or the backend has no Redis).
+    """
+    redis: Optional[Redis] = getattr(backend, "redis", None)
+    lock = settings.cache.lock
+    if redis is None or not lock.enabled:
+        yield None
+        return
+
+    lock_key = f"{key}:lock"
+    token = uuid.uuid4().hex
+    if await redis.set(lock_key, token, nx=True, px=int(lock.timeout * 1000)):
+        try:
+            yield None
+        finally:
+            await redis.eval(RELEASE_LOCK, 1, lock_key, token)
+        return
+
+    value = None
+    deadline = time.monotonic() + lock.timeout
+    while time.monotonic() < deadline:
+        await asyncio.sleep(lock.poll_interval)
+        _, value = await backend.get_with_ttl(key)
+        if value is not None or not await redis.exists(lock_key):
+            break
+    yield value
+
+
+def cache(
+    namespace: str,
+    expire: Optional[int] = None,
+    key_builder: Optional[KeyBuilder] = None,
+):
+    """Cache a GET endpoint in the ``FastAPICache`` backend.
+
+    Works like ``fastapi_cache.decorator.cache`` but misses are coalesced:
+    one request per key (per process, and across processes when
+    ``cache.lock`` is enabled) runs the endpoint while the others await
+    its result.
+
+    The ETag is the one the endpoint's response sets (``entity_etag``),
+    else a hash of the body. It is stored with the entry, so a matching
+    ``If-None-Match`` is answered with 304 straight from the cache. Bodies
+    are sent in the client's encoding from a compressed variant that is
+    cached next to the entry.
+    """
+    injected_request = Parameter(
+        "__cache_request", Parameter.KEYWORD_ONLY, annotation=Request
+    )
+    injected_response = Parameter(
+        "__cache_response", Parameter.KEYWORD_ONLY, annotation=Response
+    )
+
+    def wrapper(func):
+        signature = get_typed_signature(func)
+        return_type = get_typed_return_annotation(func)
+
+        @wraps(func)
+        async def inner(*args, **kwargs):
+            request: Request = kwargs.pop(injected_request.name)
+            response: Response = kwargs.pop(injected_response.name)
+
+            async def run() -> Any:
+                await admit(request, cache_miss=True)
+                return await func(*args, **kwargs)
+
+            # Entries may have been filled from a lagging replica, so clients
+            # pinned to the primary neither read nor fill them
+            if (
+                not FastAPICache.get_enable()
+                or request.method != "GET"
+                or request.headers.get("Cache-Control") == "no-store"
+                or db_helper.is_pinned(request)
+            ):
+                return await run()
+
+            backend = FastAPICache.get_backend()
+            coder = FastAPICache.get_coder()
+            build_key = key_builder or FastAPICache.get_key_builder()
+            try:
+                cache_key = await build_key(
+                    func,
+                    f"{FastAPICache.get_prefix()}:{namespace}",
+                    request=request,
+                    response=response,
+                    args=args,
+                    kwargs=kwargs,
+                )
+            except Exception:
+                logger.warning("Error building cache key", exc_info=True)
+                return await run()
+
+            ttl, cached = 0, None
+            if request.headers.get("Cache-Control") != "no-cache":
+                try:
+                    ttl, cached = await backend.get_with_ttl(cache_key)
+                except Exception:
+                    logger.warning(
+                        "Error retrieving cache key '%s'", cache_key, exc_info=True
+                    )
+
+            status_header = "HIT"
+            if cached is None:
+                status_header = "MISS"
+                ttl = expire or FastAPICache.get_expire()
+
+                async def compute() -> bytes:
+                    async with peer_lock(backend, cache_key) as peer_value:
+                        if peer_value is not None:
+                            return peer_value
+
+                        result = await run()
+                        payload = coder.encode(result)
+                        etag = None
+                        if isinstance(result, Response):
+                            etag = result.headers.get("ETag")
+                        value = pack_entry(etag or content_etag(payload), payload)
+                        try:
+                            await backend.set(cache_key, value, expire)
+                        except Exception:
+                            logger.warning(
+                                "Error setting cache key '%s'",
+                                cache_key,
+                                exc_info=True,
+                            )
+                        return value
+
+                cached = await single_flight.do(cache_key, compute)
+
+            if settings.metrics.enabled:
+                CACHE_REQUESTS.labels(namespace, status_header.lower()).inc()
+
+            etag, payload = unpack_entry(cached)
+            headers = {
+                "Cache-Control": f"max-age={ttl}",
+                "ETag": etag,
+                FastAPICache.get_cache_status_header(): status_header,
+            }
+            response.headers.update(headers)
+            if_none_match = request.headers.get("If-None-Match")
+            if if_none_match is not None and etag_matches(if_none_match, etag):
+                response.status_code = HTTP_304_NOT_MODIFIED
+                return response
+
+            result = coder.decode_as_type(payload, type_=return_type)
+            if not isinstance(result, Response):
+                return result
+
+            encoding = negotiate(request.headers.get("Accept-Encoding"))
+            compression = settings.compression
+            if (
+                compression.enabled
+                and encoding is not None
+                and len(result.body) >= compression.minimum_size
+            ):
+                body = await cached_variant(
+                    backend, cache_key, result.body, encoding, ttl, compression
+                )
+                result = JSONBytesResponse(body)
+                headers["Content-Encoding"] = encoding
+                headers["ETag"] = weak_etag(etag)
+                headers["Vary"] = "Accept-Encoding"
+                response.headers.update(headers)
+
+            result.headers.update(headers)
+            return result
+
+        # Lets admission control serve hits without waiting for a slot
+        inner.cached = True
+        inner.__signature__ = signature.replace(
+            parameters=[
+                *signature.parameters.values(),
+                injected_request,
+                injected_response,
+            ]
+        )
+        return inner
+
+    return wrapper
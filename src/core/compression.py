@@ -0,0 +1,179 @@
+import gzip
+import logging
+import zlib
+from typing import Callable
+
+import brotli
+from fastapi_cache.types import Backend
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.core.config import CompressionConfig
+
+logger = logging.getLogger(__name__)
+
+# In order of preference
+ENCODINGS = ("br", "gzip")
+
+
+def negotiate(accept_encoding: str | None) -> str | None:
+    """Pick the preferred encoding the client accepts, honouring ``q=0``."""
+    if not accept_encoding:
+        return None
+
+    weights = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.partition(";")
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[name.strip().lower()] = weight
+
+    for encoding in ENCODINGS:
+        if weights.get(encoding, weights.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+def compress(data: bytes, encoding: str, config: CompressionConfig) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=config.brotli_quality)
+    return gzip.compress(data, compresslevel=config.gzip_level, mtime=0)
+
+
+def stream_encoder(
+    encoding: str, config: CompressionConfig
+) -> tuple[Callable[[bytes], bytes], Callable[[], bytes]]:
+    """``(encode, finish)``; every encoded chunk is flushed so streamed rows
+    reach the client without waiting for the compressor's buffer to fill."""
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=config.brotli_quality)
+        return (
+            lambda chunk: compressor.process(chunk) + compressor.flush(),
+            compressor.finish,
+        )
+
+    compressor = zlib.compressobj(config.gzip_level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    return (
+        lambda chunk: compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH),
+        compressor.flush,
+    )
+
+
+def weak_etag(etag: str) -> str:
+    """Encoded bodies differ byte for byte, so their ETag can only be weak."""
+    return etag if etag.startswith("W/") else f"W/{etag}"
+
+
+async def cached_variant(
+    backend: Backend,
+    key: str,
+    payload: bytes,
+    encoding: str,
+    ttl: int,
+    config: CompressionConfig,
+) -> bytes:
+    """Compressed ``payload`` of cache entry ``key``, compressed once per encoding.
+
+    The variant is stored under ``key`` with the encoding appended, so it
+    carries the same generations and is invalidated along with the entry.
+    """
+    variant_key = f"{key}:{encoding}"
+    value = None
+    try:
+        _, value = await backend.get_with_ttl(variant_key)
+    except Exception:
+        logger.warning("Error retrieving cache key '%s'", variant_key, exc_info=True)
+
+    if value is None:
+        value = compress(payload, encoding, config)
+        try:
+            await backend.set(variant_key, value, max(ttl, 1))
+        except Exception:
+            logger.warning("Error setting cache key '%s'", variant_key, exc_info=True)
+    return value
+
+
+class CompressionMiddleware:
+    """gzip or brotli encode responses the client accepts.
+
+    Bodies below ``config.minimum_size``, media types not listed in
+    ``config.media_types`` and responses that already have a
+    ``Content-Encoding`` (pre-compressed cache entries) are sent as they
+    are. Streamed responses are encoded chunk by chunk.
+    """
+
+    def __init__(self, app: ASGIApp, config: CompressionConfig):
+        self.app = app
+        self.config = config
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate(Headers(scope=scope).get("Accept-Encoding"))
+        start: Message | None = None
+        encode: Callable[[bytes], bytes] | None = None
+        finish: Callable[[], bytes] | None = None
+        passthrough = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start, encode, finish, passthrough
+
+            if message["type"] == "http.response.start":
+                start = message
+                headers = MutableHeaders(scope=message)
+                compressible = self.compressible(headers)
+                if compressible:
+                    headers.add_vary_header("Accept-Encoding")
+                passthrough = not compressible or encoding is None
+                if passthrough:
+                    await send(message)
+                return
+
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if encode is None:
+                headers = MutableHeaders(scope=start)
+                if not more_body:
+                    if len(body) >= self.config.minimum_size:
+                        body = compress(body, encoding, self.config)
+                        self.mark_encoded(headers, encoding)
+                        headers["Content-Length"] = str(len(body))
+                    await send(start)
+                    await send({**message, "body": body})
+                    return
+
+                encode, finish = stream_encoder(encoding, self.config)
+                self.mark_encoded(headers, encoding)
+                del headers["Content-Length"]
+                await send(start)
+
+            body = encode(body)
+            if not more_body:
+                body += finish()
+            await send({**message, "body": body})
+
+        await self.app(scope, receive, send_wrapper)
+
+    def compressible(self, headers: MutableHeaders) -> bool:
+        if "Content-Encoding" in headers:
+            return False
+        media_type = headers.get("Content-Type", "").split(";")[0].strip()
+        return media_type.startswith(tuple(self.config.media_types))
+
+    @staticmethod
+    def mark_encoded(headers: MutableHeaders, encoding: str) -> None:
+        headers["Content-Encoding"] = encoding
+        if "ETag" in headers:
+            headers["ETag"] = weak_etag(headers["ETag"])
@@ -1,4 +1,5 @@
 from pathlib import Path
+from typing import Literal
 
 from pydantic import Field, BaseModel
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -13,6 +14,19 @@ class DBConfig(BaseSettings):
     password: str = Field(alias="DB_PASS")
     name: str
     echo: bool = False
+    stream_batch_size: int = 1000
+    pool_size: int = 10
+    max_overflow: int = 20
+    # Seconds; recycling covers connections dropped by proxies and failovers
+    pool_recycle: int = 1800
+    pool_pre_ping: bool = False
+    pool_timeout: float = 10.0
+    prepared_statement_cache_size: int = 500
+    warm_up: bool = True
+    # "host" or "host:port" of read replicas sharing the primary's credentials
+    replica_hosts: list[str] = []
+    # Seconds a client's reads stay on the primary after it writes
+    read_your_writes_ttl: int = 5
 
     model_config = SettingsConfigDict(env_file=".env", env_prefix="DB_", extra="ignore")
 
@@ -20,6 +34,16 @@ class DBConfig(BaseSettings):
     def url(self) -> str:
         return f"postgresql+asyncpg://{self.user}:{self.password}@{self.host}:{self.port}/{self.name}"
 
+    @property
+    def replica_urls(self) -> list[str]:
+        urls = []
+        for replica in self.replica_hosts:
+            host, _, port = replica.partition(":")
+            urls.append(
+                f"postgresql+asyncpg://{self.user}:{self.password}@{host}:{port or self.port}/{self.name}"
+            )
+        return urls
+
 
 class RedisConfig(BaseSettings):
     host: str = "localhost"
@@ -34,21 +58,173 @@ class RedisConfig(BaseSettings):
 class AuthorsNamespace(BaseModel):
     authors_list: str = "authors_list"
     author: str = "author"
+    authors_search: str = "authors_search"
+    # Generations bumped by every author write / additionally by deletes
+    # (books go with their author through ON DELETE CASCADE)
+    on_write: list[str] = [
+        "authors_list",
+        "authors_search",
+        "stats_totals",
+        "stats_authors_per_age",
+    ]
+    on_delete: list[str] = [
+        "books_list",
+        "book",
+        "books_search",
+        "stats_books_per_author",
+        "stats_books_per_year",
+    ]
 
 
 class BooksNamespace(BaseModel):
     books_list: str = "books_list"
     book: str = "book"
+    books_search: str = "books_search"
+    # Author lists embed books with ?include=books
+    on_write: list[str] = [
+        "books_list",
+        "books_search",
+        "authors_list",
+        "stats_totals",
+        "stats_books_per_author",
+        "stats_books_per_year",
+    ]
+    on_delete: list[str] = []
+
+
+class StatsNamespace(BaseModel):
+    totals: str = "stats_totals"
+    books_per_author: str = "stats_books_per_author"
+    books_per_year: str = "stats_books_per_year"
+    authors_per_age: str = "stats_authors_per_age"
 
 
 class CacheNamespace(BaseModel):
     authors: AuthorsNamespace = AuthorsNamespace()
     books: BooksNamespace = BooksNamespace()
+    stats: StatsNamespace = StatsNamespace()
+
+
+class L1CacheConfig(BaseModel):
+    max_entries: int = 10_000
+    max_bytes: int = 64 * 1024 * 1024
+    ttl: int = 30
+
+
+class CacheLockConfig(BaseModel):
+    enabled: bool = True
+    timeout: float = 5.0
+    poll_interval: float = 0.05
+
+
+class CacheGenerationsConfig(BaseModel):
+    # How long a worker trusts its local copy without pub/sub confirmation
+    local_ttl: float = 30.0
+    # Must stay well above every cache expire, see CacheGenerations
+    ttl: int = 24 * 60 * 60
+
+
+class CacheZstdConfig(BaseModel):
+    enabled: bool = False
+    level: int = 3
+    # Smaller values are stored uncompressed
+    minimum_size: int = 4096
+
+
+class CacheCoderConfig(BaseModel):
+    # orjson stores response bodies as they are; msgpack is more compact,
+    # but every hit decodes it and encodes JSON again
+    format: Literal["orjson", "msgpack"] = "orjson"
+    zstd: CacheZstdConfig = CacheZstdConfig()
 
 
 class CacheConfig(BaseModel):
     prefix: str = "cache"
+    expire: int = 60
     namespace: CacheNamespace = CacheNamespace()
+    l1: L1CacheConfig = L1CacheConfig()
+    invalidation_channel: str = "cache:invalidate"
+    lock: CacheLockConfig = CacheLockConfig()
+    generations: CacheGenerationsConfig = CacheGenerationsConfig()
+    coder: CacheCoderConfig = CacheCoderConfig()
+
+
+class PaginationConfig(BaseModel):
+    default_limit: int = 50
+    max_limit: int = 500
+
+
+class BulkConfig(BaseModel):
+    max_items: int = 5000
+
+
+class MetricsConfig(BaseModel):
+    enabled: bool = True
+    path: str = "/metrics"
+
+
+class ProfilingConfig(BaseModel):
+    # Allow profiling single requests that send the header
+    enabled: bool = False
+    header: str = "X-Profile"
+    # When set, the header value has to match it
+    token: str = ""
+    interval: float = 0.001
+    # Profile every N-th request into directory, 0 turns it off
+    sample_every: int = 0
+    directory: Path = BASE_DIR.parent / "profiles"
+    max_files: int = 100
+
+
+class CompressionConfig(BaseModel):
+    enabled: bool = True
+    # Smaller bodies are sent as they are
+    minimum_size: int = 1024
+    media_types: list[str] = ["application/json", "application/x-ndjson", "text/"]
+    gzip_level: int = 6
+    brotli_quality: int = 5
+
+
+class AdmissionConfig(BaseModel):
+    enabled: bool = True
+    # Requests using the database at once, 0 is the primary's
+    # pool_size + max_overflow
+    limit: int = 0
+    # Requests waiting for a slot; the ones beyond are turned away at once
+    queue_size: int = 100
+    # Seconds a request waits for its slots before it is turned away
+    timeout: float = 2.0
+    # Caps of single routes, e.g. {"GET /books/csv": 2}
+    route_limits: dict[str, int] = {}
+    route_queue_size: int = 10
+    # Seconds, sent in Retry-After with 429 and 503
+    retry_after: int = 1
+
+
+class LoggingConfig(BaseModel):
+    # Write records from a listener thread instead of the event loop
+    queue: bool = True
+    # Share of INFO records kept inside requests, per route template in
+    # sample_rates, e.g. {"GET /books/{book_id}": 0.01}
+    sample_rate: float = 1.0
+    sample_rates: dict[str, float] = {}
+
+
+class QueryLogConfig(BaseModel):
+    enabled: bool = True
+    # Log every statement shape a request ran, with counts, at DEBUG
+    statements: bool = False
+    slow_threshold_ms: float = 200.0
+    # Warn when a request runs one statement shape more often than this
+    repeat_threshold: int = 10
+
+
+class SearchConfig(BaseModel):
+    max_query_length: int = 100
+    # Ranked results are paged by offset, so deep pages get expensive
+    max_offset: int = 1000
+    # Trigram matching needs the pg_trgm extension
+    fuzzy: bool = True
 
 
 class AuthJWT(BaseModel):
@@ -61,6 +237,15 @@ class Settings(BaseSettings):
     db: DBConfig = DBConfig()
     redis: RedisConfig = RedisConfig()
     cache: CacheConfig = CacheConfig()
+    pagination: PaginationConfig = PaginationConfig()
+    bulk: BulkConfig = BulkConfig()
+    search: SearchConfig = SearchConfig()
+    metrics: MetricsConfig = MetricsConfig()
+    profiling: ProfilingConfig = ProfilingConfig()
+    query_log: QueryLogConfig = QueryLogConfig()
+    logging: LoggingConfig = LoggingConfig()
+    compression: CompressionConfig = CompressionConfig()
+    admission: AdmissionConfig = AdmissionConfig()
     auth_jwt: AuthJWT = AuthJWT()
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
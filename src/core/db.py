@@ -1,24 +1,157 @@
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
-from src.core.config import settings
+import asyncio
+import itertools
+from contextlib import AsyncExitStack
+from typing import Awaitable, Callable, Sequence
+
+from fastapi import Request, Response
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    create_async_engine,
+    async_sessionmaker,
+    AsyncSession,
+)
+from src.core.admission import admit
+from src.core.config import QueryLogConfig, settings
+from src.core.metrics import InstrumentedPool, instrument_engine
+from src.core.query_log import log_queries
+
+PRIMARY_COOKIE = "db_primary"
+PRIMARY_HEADER = "X-DB-Primary"
+READ_METHODS = {"GET", "HEAD"}
 
 
 class DataBaseHelper:
-    def __init__(self, url: str, echo: bool):
-        self.engine = create_async_engine(url=url, echo=echo)
-        self.session_factory = async_sessionmaker(
-            bind=self.engine,
-            autoflush=False,
-            autocommit=False,
-            expire_on_commit=False,
+    def __init__(
+        self,
+        url: str,
+        echo: bool,
+        pool_size: int = 5,
+        max_overflow: int = 10,
+        pool_recycle: int = -1,
+        pool_pre_ping: bool = False,
+        pool_timeout: float = 30.0,
+        prepared_statement_cache_size: int = 100,
+        replica_urls: Sequence[str] = (),
+        read_your_writes_ttl: int = 5,
+        metrics: bool = False,
+        query_log: QueryLogConfig | None = None,
+    ):
+        def make_engine(engine_url: str, label: str) -> AsyncEngine:
+            engine = create_async_engine(
+                url=engine_url,
+                echo=echo,
+                pool_size=pool_size,
+                max_overflow=max_overflow,
+                pool_recycle=pool_recycle,
+                pool_pre_ping=pool_pre_ping,
+                pool_timeout=pool_timeout,
+                connect_args={
+                    "prepared_statement_cache_size": prepared_statement_cache_size
+                },
+                **({"poolclass": InstrumentedPool} if metrics else {}),
+            )
+            if metrics:
+                instrument_engine(engine, label)
+            if query_log is not None:
+                log_queries(engine, query_log, label)
+            return engine
+
+        def make_session_factory(engine: AsyncEngine) -> async_sessionmaker:
+            return async_sessionmaker(
+                bind=engine,
+                autoflush=False,
+                autocommit=False,
+                expire_on_commit=False,
+            )
+
+        self.engine = make_engine(url, "primary")
+        self.replica_engines = [
+            make_engine(x, f"replica{i}") for i, x in enumerate(replica_urls)
+        ]
+        self.pool_size = pool_size
+        self.read_your_writes_ttl = read_your_writes_ttl
+        self.session_factory = make_session_factory(self.engine)
+        self.replica_session_factories = [
+            make_session_factory(x) for x in self.replica_engines
+        ]
+        self._replicas = itertools.cycle(self.replica_session_factories)
+
+    @property
+    def engines(self) -> list[AsyncEngine]:
+        return [self.engine, *self.replica_engines]
+
+    def is_pinned(self, request: Request) -> bool:
+        """Whether the client has to read its own writes from the primary
+        instead of a replica."""
+        if not self.replica_session_factories:
+            return False
+        return PRIMARY_COOKIE in request.cookies or PRIMARY_HEADER in request.headers
+
+    def read_session_factory(self, request: Request) -> async_sessionmaker:
+        """Pick a replica round-robin unless the client has to read its own writes."""
+        if self.is_pinned(request) or not self.replica_session_factories:
+            return self.session_factory
+        return next(self._replicas)
+
+    def pin_to_primary(self, response: Response) -> None:
+        response.set_cookie(
+            PRIMARY_COOKIE,
+            "1",
+            max_age=self.read_your_writes_ttl,
+            httponly=True,
+            samesite="lax",
         )
 
-    async def session_dependency(self) -> AsyncSession:
-        async with self.session_factory() as session:
+    async def session_dependency(
+        self, request: Request, response: Response
+    ) -> AsyncSession:
+        await admit(request)
+        if request.method in READ_METHODS:
+            factory = self.read_session_factory(request)
+        else:
+            factory = self.session_factory
+            self.pin_to_primary(response)
+
+        async with factory() as session:
             yield session
             await session.close()
 
+    async def warm_up(self, queries: Callable[[AsyncSession], Awaitable]) -> None:
+        """Open every pool to its minimum size and run ``queries`` on each connection.
+
+        All connections are held at once so the pool really grows instead of
+        handing the same connection out again; asyncpg caches prepared
+        statements per connection.
+        """
+        async with AsyncExitStack() as stack:
+            connections = await asyncio.gather(
+                *(
+                    stack.enter_async_context(engine.connect())
+                    for engine in self.engines
+                    for _ in range(self.pool_size)
+                )
+            )
+            for conn in connections:
+                async with AsyncSession(bind=conn) as session:
+                    await queries(session)
+                await conn.rollback()
+
+    async def dispose(self) -> None:
+        for engine in self.engines:
+            await engine.dispose()
+
 
 db_helper = DataBaseHelper(
     url=settings.db.url,
     echo=settings.db.echo,
+    pool_size=settings.db.pool_size,
+    max_overflow=settings.db.max_overflow,
+    pool_recycle=settings.db.pool_recycle,
+    pool_pre_ping=settings.db.pool_pre_ping,
+    pool_timeout=settings.db.pool_timeout,
+    prepared_statement_cache_size=settings.db.prepared_statement_cache_size,
+    replica_urls=settings.db.replica_urls,
+    read_your_writes_ttl=settings.db.read_your_writes_ttl,
+    metrics=settings.metrics.enabled,
+    query_log=settings.query_log if settings.query_log.enabled else None,
 )
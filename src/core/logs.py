@@ -0,0 +1,140 @@
+import atexit
+import json
+import logging
+import logging.config
+import queue
+import random
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from src.core.config import LoggingConfig
+
+_scope: ContextVar[Scope | None] = ContextVar("log_scope", default=None)
+
+
+def current_route() -> str | None:
+    """``GET /books/{book_id}`` while a request is handled, else None."""
+    scope = _scope.get()
+    if scope is None:
+        return None
+    route = scope.get("route")
+    return f"{scope['method']} {getattr(route, 'path', scope['path'])}"
+
+
+class LogContextMiddleware:
+    """Make the request's route available to log records."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        token = _scope.set(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _scope.reset(token)
+
+
+class RouteSampler(logging.Filter):
+    """Tag records with the current route and keep a share of its INFO records.
+
+    Warnings and errors always pass, so do records outside of requests.
+    """
+
+    def __init__(self, config: LoggingConfig):
+        super().__init__()
+        self.config = config
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.route = route = current_route()
+        if route is None or record.levelno != logging.INFO:
+            return True
+        rate = self.config.sample_rates.get(route, self.config.sample_rate)
+        return rate >= 1 or random.random() < rate
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line, for log shippers."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(
+                timespec="milliseconds"
+            ),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "route", None):
+            data["route"] = record.route
+        if record.exc_info:
+            data["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class RoutingQueueHandler(QueueHandler):
+    """Queue records for the handlers a logger had in the config file.
+
+    Records are queued unformatted: building the message, tracebacks
+    included, is left to the listener thread.
+    """
+
+    def __init__(self, queue_: queue.SimpleQueue, handlers: list[logging.Handler]):
+        super().__init__(queue_)
+        self.targets = handlers
+
+    def prepare(self, record: logging.LogRecord) -> tuple:
+        return record, self.targets
+
+
+class RoutingQueueListener(QueueListener):
+    def __init__(self, queue_: queue.SimpleQueue):
+        super().__init__(queue_)
+
+    def handle(self, item: tuple) -> None:
+        record, handlers = item
+        for handler in handlers:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+
+def configure_logging(path: str, config: LoggingConfig) -> QueueListener | None:
+    """Load ``path`` and, with ``config.queue``, move its handlers off the caller.
+
+    Every logger that has handlers gets a queue handler in their place; a
+    single listener thread writes each record to the original handlers of
+    its logger, so console rendering and file writes never block the event
+    loop.
+    """
+    logging.config.fileConfig(path, disable_existing_loggers=False)
+    sampler = RouteSampler(config)
+
+    manager = logging.Logger.manager
+    loggers = [logging.getLogger()] + [
+        x for x in manager.loggerDict.values() if isinstance(x, logging.Logger)
+    ]
+    loggers = [x for x in loggers if x.handlers]
+
+    if not config.queue:
+        for handler in {h for x in loggers for h in x.handlers}:
+            handler.addFilter(sampler)
+        return None
+
+    queue_ = queue.SimpleQueue()
+    for logger in loggers:
+        handler = RoutingQueueHandler(queue_, list(logger.handlers))
+        handler.addFilter(sampler)
+        logger.handlers = [handler]
+
+    listener = RoutingQueueListener(queue_)
+    listener.start()
+    # Drain what is still queued on interpreter exit
+    atexit.register(listener.stop)
+    return listener
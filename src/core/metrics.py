@@ -0,0 +1,189 @@
+import os
+import time
+from pathlib import Path
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.core.timing import observe_statements
+
+# With several workers set PROMETHEUS_MULTIPROC_DIR (emptied before the
+# server starts) so every process writes its samples there and /metrics
+# aggregates them; gauges report the sum over processes not marked dead,
+# see mark_dead_processes.
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out",
+    "Connections currently checked out of the pool",
+    ["engine"],
+    multiprocess_mode="livesum",
+)
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow",
+    "Connections open beyond pool_size",
+    ["engine"],
+    multiprocess_mode="livesum",
+)
+DB_POOL_WAIT = Histogram(
+    "db_pool_wait_seconds",
+    "Time spent waiting for a pooled connection",
+    ["engine"],
+)
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds",
+    "SQL statement execution time by statement type",
+    ["engine", "statement"],
+)
+CACHE_REQUESTS = Counter(
+    "cache_requests_total",
+    "Cached route lookups by namespace and result",
+    ["namespace", "result"],
+)
+CACHE_INVALIDATIONS = Counter(
+    "cache_invalidations_total",
+    "Generation bumps by namespace",
+    ["namespace"],
+)
+ADMISSION_REJECTIONS = Counter(
+    "admission_rejections_total",
+    "Requests turned away before reaching the database",
+    ["route", "reason"],
+)
+
+
+def cache_namespace_label(namespace: str) -> str:
+    """``author:42`` -> ``author``, so entity ids don't become label values."""
+    return namespace.split(":", 1)[0]
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long a checkout waited for a connection.
+
+    ``_do_get`` is where the pool blocks when it is exhausted; SQLAlchemy has
+    no pool event for the start of a checkout.
+    """
+
+    engine_label = "primary"
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_WAIT.labels(self.engine_label).observe(time.perf_counter() - start)
+
+
+def instrument_engine(engine: AsyncEngine, label: str) -> None:
+    """Export pool usage and statement timings of ``engine``."""
+    sync_engine = engine.sync_engine
+    pool = sync_engine.pool
+    if isinstance(pool, InstrumentedPool):
+        pool.engine_label = label
+
+    checked_out = DB_POOL_CHECKED_OUT.labels(label)
+    overflow = DB_POOL_OVERFLOW.labels(label)
+
+    # checkin fires before the connection is back in the pool, so the count
+    # is tracked here; overflow is as of the last checkout or checkin
+    @event.listens_for(pool, "checkout")
+    def on_checkout(*args) -> None:
+        checked_out.inc()
+        overflow.set(max(pool.overflow(), 0))
+
+    @event.listens_for(pool, "checkin")
+    def on_checkin(*args) -> None:
+        checked_out.dec()
+        overflow.set(max(pool.overflow(), 0))
+
+    def observe(conn, statement, parameters, executemany, elapsed) -> None:
+        kind = statement.lstrip().split(None, 1)[0].upper() if statement else ""
+        DB_QUERY_DURATION.labels(label, kind).observe(elapsed)
+
+    observe_statements(engine, observe)
+
+
+class MetricsMiddleware:
+    """Observe request latency labelled with the matched route template."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # The router stores the matched route in the shared scope
+            route = scope.get("route")
+            HTTP_REQUEST_DURATION.labels(
+                scope["method"], getattr(route, "path", ""), str(status)
+            ).observe(time.perf_counter() - start)
+
+
+def metrics_endpoint(request: Request) -> Response:
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def mark_dead_processes(exiting: bool = False) -> None:
+    """Drop the live gauge samples of workers that are gone.
+
+    Called on startup for workers that crashed or were killed, and with
+    ``exiting`` on shutdown for this one. Without it their pool gauges
+    stay in the sums for good.
+    """
+    directory = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if not directory:
+        return
+    if exiting:
+        multiprocess.mark_process_dead(os.getpid(), directory)
+        return
+    for path in Path(directory).glob("gauge_live*_*.db"):
+        pid = path.stem.rsplit("_", 1)[-1]
+        if pid.isdigit() and not _pid_alive(int(pid)):
+            multiprocess.mark_process_dead(int(pid), directory)
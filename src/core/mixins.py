@@ -1,7 +1,21 @@
-from typing import TypeVar, Optional
+from typing import TypeVar, Optional, Sequence, AsyncIterable, Callable, Awaitable
+from asyncpg import PostgresError
 from fastapi import HTTPException, status
+from pydantic import BaseModel
+from sqlalchemy.exc import DBAPIError
+
+from src.core.base_repository import BaseRepository
+from src.core.config import settings
+from src.core.schemas import Page
+from src.core.utils import (
+    encode_cursor,
+    decode_cursor,
+    decode_cursor_key,
+    iter_csv_rows,
+)
 
 T = TypeVar("T")
+S = TypeVar("S", bound=BaseModel)
 
 
 class ServiceMixin:
@@ -10,3 +24,113 @@ class ServiceMixin:
         if obj is None:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=detail)
         return obj
+
+    @staticmethod
+    async def check_version(
+        repo: BaseRepository, obj_id: int, version: int | None
+    ) -> None:
+        """Tell a stale ``If-Match`` (412) apart from a missing row (404)
+        after a versioned update matched nothing."""
+        if version is not None and await repo.get_one(obj_id) is not None:
+            raise HTTPException(
+                status_code=status.HTTP_412_PRECONDITION_FAILED,
+                detail="Entity was modified, fetch it again",
+            )
+
+    @staticmethod
+    def make_page(
+        rows: Sequence, limit: int, schema: type[S], sort: str = "id"
+    ) -> Page[S]:
+        """Build a page from ``limit + 1`` rows, the extra row only signals
+        that there is a next page."""
+        items = [schema.model_validate(x) for x in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            name = sort.removeprefix("-")
+            key = getattr(items[-1], name) if name != "id" else None
+            next_cursor = encode_cursor(items[-1].id, key)
+        return Page[schema](items=items, next_cursor=next_cursor)
+
+    @classmethod
+    async def fetch_page(
+        cls,
+        repo: BaseRepository,
+        schema: type[S],
+        cursor: str | None,
+        limit: int,
+        sort: str = "id",
+        where: Sequence = (),
+        options: Sequence = (),
+    ) -> Page[S]:
+        after_id = decode_cursor(cursor)
+        after_key = None
+        if after_id is not None and sort.removeprefix("-") != "id":
+            after_key = decode_cursor_key(cursor, repo.sort_key_type(sort))
+
+        rows = await repo.get_page(
+            after_id=after_id,
+            limit=limit + 1,
+            options=options,
+            where=where,
+            sort=sort,
+            after_key=after_key,
+        )
+        return cls.make_page(rows, limit, schema, sort)
+
+    @staticmethod
+    def search_offset(cursor: str | None) -> int:
+        offset = decode_cursor(cursor) or 0
+        if not 0 <= offset <= settings.search.max_offset:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+            )
+        return offset
+
+    @staticmethod
+    def make_offset_page(
+        rows: Sequence, offset: int, limit: int, schema: type[S]
+    ) -> Page[S]:
+        """Like ``make_page`` for ranked results, the cursor holds the offset."""
+        items = [schema.model_validate(x) for x in rows[:limit]]
+        next_offset = offset + limit
+        has_next = len(rows) > limit and next_offset <= settings.search.max_offset
+        next_cursor = encode_cursor(next_offset) if has_next else None
+        return Page[schema](items=items, next_cursor=next_cursor)
+
+    @staticmethod
+    async def load_csv(
+        repo: BaseRepository,
+        chunks: AsyncIterable[bytes],
+        schema: type[BaseModel],
+        before_merge: Callable[[Sequence[str]], Awaitable[None]] | None = None,
+    ) -> int:
+        """COPY a CSV body (header row first) into ``repo``'s table.
+
+        Each row is validated against ``schema``, the create schema of the
+        entity, so imported rows obey the same constraints as the API.
+        Rows are staged first so ``before_merge`` can validate them set-wise,
+        or derive data from them, in the same transaction before anything
+        becomes visible; any failure rolls the load back.
+        """
+        rows = iter_csv_rows(chunks)
+        try:
+            columns = await anext(rows, None)
+            if not columns:
+                raise ValueError("CSV header is missing")
+            repo.check_csv_columns(columns)
+
+            records = (repo.parse_csv_row(columns, row, schema) async for row in rows)
+            await repo.stage_records(columns, records)
+            if before_merge is not None:
+                await before_merge(columns)
+
+            return await repo.merge_staged(columns)
+        except (ValueError, PostgresError, DBAPIError) as e:
+            await repo.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+                detail=f"Invalid CSV: {e}",
+            )
+        except BaseException:
+            await repo.rollback()
+            raise
@@ -3,3 +3,4 @@ all = ["Author", "Book", "Base"]
 from .base_model import Base
 from .author import AuthorModel
 from .book import BookModel
+from .catalog_stat import CatalogStatModel, StatMetric
@@ -1,6 +1,7 @@
 from typing import TYPE_CHECKING
 
-from sqlalchemy import String
+from sqlalchemy import String, Computed, Index
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import Mapped, relationship, mapped_column
 
 from .base_model import Base
@@ -12,12 +13,28 @@ if TYPE_CHECKING:
 
 class AuthorModel(Base):
     __tablename__ = "authors"
+    # pg_trgm indexes on the names are created by the search migration only
+    __table_args__ = (
+        Index("ix_authors_search_vector", "search_vector", postgresql_using="gin"),
+        Index("ix_authors_last_name_id", "last_name", "id"),
+        Index("ix_authors_age_id", "age", "id"),
+    )
 
     first_name: Mapped[str] = mapped_column(String(32))
     last_name: Mapped[str] = mapped_column(String(32))
     age: Mapped[int]
     bio: Mapped[str | None] = None
     email: Mapped[str]
+    # Bumped by every update, clients get it back as the ETag
+    version: Mapped[int] = mapped_column(server_default="1")
+    __mapper_args__ = {"version_id_col": version}
+    search_vector: Mapped[str] = mapped_column(
+        TSVECTOR,
+        Computed(
+            "to_tsvector('simple', first_name || ' ' || last_name)", persisted=True
+        ),
+        deferred=True,
+    )
 
     books: Mapped[list["BookModel"]] = relationship(
         back_populates="author", passive_deletes=True
@@ -1,6 +1,7 @@
 from typing import TYPE_CHECKING
 
-from sqlalchemy import ForeignKey
+from sqlalchemy import ForeignKey, Computed, Index
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import Mapped, relationship, mapped_column
 
 from .base_model import Base
@@ -11,11 +12,28 @@ if TYPE_CHECKING:
 
 class BookModel(Base):
     __tablename__ = "books"
+    # The pg_trgm index on title is created by the search migration only,
+    # so create_all works without the extension
+    __table_args__ = (
+        Index("ix_books_search_vector", "search_vector", postgresql_using="gin"),
+        # Also serves the author_id foreign key for ON DELETE CASCADE
+        Index("ix_books_author_id_year", "author_id", "year"),
+        Index("ix_books_year_id", "year", "id"),
+    )
 
     title: Mapped[str]
     year: Mapped[int]
     author_id: Mapped[int] = mapped_column(
         ForeignKey("authors.id", ondelete="CASCADE")
     )
+    # Bumped by every update, clients get it back as the ETag
+    version: Mapped[int] = mapped_column(server_default="1")
+    __mapper_args__ = {"version_id_col": version}
+
+    search_vector: Mapped[str] = mapped_column(
+        TSVECTOR,
+        Computed("to_tsvector('simple', title)", persisted=True),
+        deferred=True,
+    )
 
     author: Mapped["AuthorModel"] = relationship(back_populates="books")
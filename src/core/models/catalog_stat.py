@@ -0,0 +1,27 @@
+from enum import StrEnum
+
+from sqlalchemy import BigInteger, String, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base_model import Base
+
+
+class StatMetric(StrEnum):
+    BOOKS_PER_AUTHOR = "books_per_author"
+    BOOKS_PER_YEAR = "books_per_year"
+    AUTHORS_PER_AGE = "authors_per_age"
+
+
+class CatalogStatModel(Base):
+    """One row per non-empty group, kept current by the service write paths."""
+
+    __tablename__ = "catalog_stats"
+    __table_args__ = (
+        UniqueConstraint("metric", "key", name="uq_catalog_stats_metric_key"),
+    )
+
+    # Every upsert draws from the sequence, conflicting or not
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    metric: Mapped[str] = mapped_column(String(32))
+    key: Mapped[int]
+    total: Mapped[int]
@@ -0,0 +1,98 @@
+import asyncio
+import hmac
+import itertools
+import re
+import time
+from pathlib import Path
+
+from pyinstrument import Profiler
+from pyinstrument.renderers import SpeedscopeRenderer
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.core.config import ProfilingConfig
+
+
+class ProfilingMiddleware:
+    """Profile single requests with pyinstrument.
+
+    A request carrying ``config.header`` (with ``config.token`` as its value
+    when one is set) gets the speedscope profile back instead of its normal
+    response. Independently, every ``config.sample_every``-th request is
+    profiled and its profile written to ``config.directory``, which keeps
+    the newest ``config.max_files`` profiles. Open them at speedscope.app.
+    """
+
+    def __init__(self, app: ASGIApp, config: ProfilingConfig):
+        self.app = app
+        self.config = config
+        self.requests = itertools.count(1)
+
+    def requested(self, scope: Scope) -> bool:
+        value = Headers(scope=scope).get(self.config.header)
+        if value is None:
+            return False
+        return not self.config.token or hmac.compare_digest(value, self.config.token)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if self.config.enabled and self.requested(scope):
+            await self.profile_to_response(scope, receive, send)
+            return
+
+        every = self.config.sample_every
+        if every and next(self.requests) % every == 0:
+            await self.profile_to_directory(scope, receive, send)
+            return
+
+        await self.app(scope, receive, send)
+
+    def profiler(self) -> Profiler:
+        # async_mode keeps other requests' coroutines out of the profile
+        return Profiler(interval=self.config.interval, async_mode="enabled")
+
+    async def profile_to_response(
+        self, scope: Scope, receive: Receive, send: Send
+    ) -> None:
+        async def discard(message: Message) -> None:
+            pass
+
+        profiler = self.profiler()
+        profiler.start()
+        try:
+            await self.app(scope, receive, discard)
+        finally:
+            profiler.stop()
+
+        response = Response(
+            profiler.output(SpeedscopeRenderer()), media_type="application/json"
+        )
+        await response(scope, receive, send)
+
+    async def profile_to_directory(
+        self, scope: Scope, receive: Receive, send: Send
+    ) -> None:
+        profiler = self.profiler()
+        profiler.start()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            profiler.stop()
+            route = getattr(scope.get("route"), "path", scope["path"])
+            name = re.sub(r"[^\w.-]+", "_", f"{scope['method']}{route}").strip("_")
+            output = profiler.output(SpeedscopeRenderer())
+            await asyncio.to_thread(self.store, name, output)
+
+    def store(self, name: str, output: str) -> None:
+        directory = Path(self.config.directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"{time.time_ns()}-{name}.speedscope.json"
+        path.write_text(output)
+
+        profiles = sorted(directory.glob("*.speedscope.json"))
+        for old in profiles[: -self.config.max_files]:
+            old.unlink(missing_ok=True)
@@ -0,0 +1,169 @@
+import logging
+import re
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Iterator
+
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from src.core.config import QueryLogConfig
+from src.core.timing import observe_statements
+
+logger = logging.getLogger(__name__)
+
+# asyncpg placeholders, including expanded IN lists: "$3::INTEGER, $4::INTEGER"
+_PARAMETERS = re.compile(r"\$\d+(?:::\w+)?(?:,\s*\$\d+(?:::\w+)?)*")
+
+
+def statement_shape(statement: str) -> str:
+    """Collapse whitespace and placeholders so repeats of a query compare equal."""
+    return _PARAMETERS.sub("?", " ".join(statement.split()))
+
+
+def redact(parameters: Any, executemany: bool = False) -> str:
+    """Describe bound parameters by type only, values never reach the log."""
+    if executemany:
+        return f"<{len(parameters)} rows>"
+    if isinstance(parameters, dict):
+        return repr({k: type(v).__name__ for k, v in parameters.items()})
+    return repr(tuple(type(v).__name__ for v in parameters or ()))
+
+
+@dataclass
+class QueryLog:
+    """Statements one request executed, grouped by shape."""
+
+    scope: Scope
+    statements: Counter[str] = field(default_factory=Counter)
+    duration: float = 0.0
+
+    @property
+    def route(self) -> str:
+        # Routing fills scope["route"] before the endpoint runs any query
+        route = self.scope.get("route")
+        return f"{self.scope['method']} {getattr(route, 'path', self.scope['path'])}"
+
+    @property
+    def total(self) -> int:
+        return sum(self.statements.values())
+
+
+@dataclass
+class QueryBudget:
+    limit: int
+    statements: Counter[str] = field(default_factory=Counter)
+
+    @property
+    def total(self) -> int:
+        return sum(self.statements.values())
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+_request_log: ContextVar[QueryLog | None] = ContextVar("query_log", default=None)
+_budgets: ContextVar[tuple[QueryBudget, ...]] = ContextVar("query_budgets", default=())
+
+
+def current_route() -> str:
+    log = _request_log.get()
+    return log.route if log is not None else "-"
+
+
+@contextmanager
+def query_budget(limit: int) -> Iterator[QueryBudget]:
+    """Fail with ``QueryBudgetExceeded`` if the block runs more than ``limit`` statements.
+
+    Only statements on engines passed to ``log_queries`` are counted.
+    """
+    budget = QueryBudget(limit)
+    token = _budgets.set((*_budgets.get(), budget))
+    try:
+        yield budget
+    finally:
+        _budgets.reset(token)
+
+    if budget.total > limit:
+        details = "\n".join(
+            f"  {count} x {shape}" for shape, count in budget.statements.most_common()
+        )
+        raise QueryBudgetExceeded(
+            f"{budget.total} statements executed, budget is {limit}:\n{details}"
+        )
+
+
+def log_queries(engine: AsyncEngine, config: QueryLogConfig, label: str) -> None:
+    """Attribute statements on ``engine`` to the current request and log slow ones."""
+
+    def record(conn, statement, parameters, executemany, elapsed) -> None:
+        shape = statement_shape(statement)
+
+        log = _request_log.get()
+        if log is not None:
+            log.statements[shape] += 1
+            log.duration += elapsed
+        for budget in _budgets.get():
+            budget.statements[shape] += 1
+
+        if elapsed * 1000 >= config.slow_threshold_ms:
+            logger.warning(
+                "Slow query on %s (%s, %.1f ms): %s params=%s",
+                current_route(),
+                label,
+                elapsed * 1000,
+                shape,
+                redact(parameters, executemany),
+            )
+
+    observe_statements(engine, record)
+
+
+class QueryLogMiddleware:
+    """Collect the statements of each request and report repeated ones.
+
+    A statement shape running more than ``config.repeat_threshold`` times in
+    one request usually is a lazy load or a repository call inside a loop.
+    """
+
+    def __init__(self, app: ASGIApp, config: QueryLogConfig):
+        self.app = app
+        self.config = config
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        log = QueryLog(scope)
+        token = _request_log.set(log)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_log.reset(token)
+            self.report(log)
+
+    def report(self, log: QueryLog) -> None:
+        if self.config.statements and log.statements:
+            logger.debug(
+                "%s ran %d statements in %.1f ms:\n%s",
+                log.route,
+                log.total,
+                log.duration * 1000,
+                "\n".join(
+                    f"  {count} x {shape}"
+                    for shape, count in log.statements.most_common()
+                ),
+            )
+
+        for shape, count in log.statements.items():
+            if count > self.config.repeat_threshold:
+                logger.warning(
+                    "Possible N+1 on %s: statement ran %d times: %s",
+                    log.route,
+                    count,
+                    shape,
+                )
@@ -0,0 +1,27 @@
+from functools import cache
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from pydantic_core import to_jsonable_python
+
+
+@cache
+def type_adapter(tp: Any) -> TypeAdapter:
+    return TypeAdapter(tp)
+
+
+class JSONBytesResponse(JSONResponse):
+    """JSON response that sends already encoded bytes untouched."""
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return orjson.dumps(content, default=to_jsonable_python)
+
+
+def json_response(tp: Any, value: Any, **kwargs) -> JSONBytesResponse:
+    """Serialize ``value`` once with pydantic-core, skipping the second
+    validation FastAPI would run against ``response_model``."""
+    return JSONBytesResponse(type_adapter(tp).dump_json(value), **kwargs)
@@ -0,0 +1,41 @@
+import time
+from typing import Any, Callable
+from weakref import WeakKeyDictionary
+
+from sqlalchemy import Connection, Engine, event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+StatementObserver = Callable[[Connection, str, Any, bool, float], None]
+
+_observers: WeakKeyDictionary[Engine, list[StatementObserver]] = WeakKeyDictionary()
+
+
+def observe_statements(engine: AsyncEngine, observer: StatementObserver) -> None:
+    """Call ``observer(conn, statement, parameters, executemany, elapsed)``
+    after every statement ``engine`` runs.
+
+    Metrics and the query log both need statement durations; each statement
+    is timed once however many observers there are.
+    """
+    sync_engine = engine.sync_engine
+    observers = _observers.get(sync_engine)
+    if observers is not None:
+        observers.append(observer)
+        return
+    observers = _observers[sync_engine] = [observer]
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def start_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def stop_timer(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        for x in observers:
+            x(conn, statement, parameters, executemany, elapsed)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def drop_timer(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_start"):
+            conn.info["query_start"].pop()
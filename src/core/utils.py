@@ -1,6 +1,14 @@
-import hashlib
+import base64
+import codecs
+import csv
+import json
+from typing import Annotated, Any, AsyncIterable, AsyncIterator
+
+from fastapi import Header, HTTPException, Query, status
 from starlette.requests import Request
-from fastapi_cache import FastAPICache
+
+from src.core.cache import make_cache_key
+from src.core.config import settings
 
 
 async def custom_key_builder(
@@ -8,30 +16,122 @@ async def custom_key_builder(
     namespace: str,
     request: Request,
     response=None,
-    *args,
-    **kwargs,
+    args: tuple = (),
+    kwargs: dict | None = None,
 ):
-    prefix = FastAPICache.get_prefix()
+    kwargs = kwargs or {}
+    params = {}
+    for k, v in kwargs.items():
+        if isinstance(v, (str, int, float, bool)):
+            params[k] = v
+        elif hasattr(v, "model_dump"):
+            # Fields come out in declaration order whatever the query string
+            # order was; defaults are dropped so ?sort=id keys like no sort
+            params[k] = v.model_dump(exclude_defaults=True)
+        # Unset optional params and injected services are not part of the key
+
+    # The validated int, not the raw path segment: writes bump the
+    # generation of the canonical id, /authors/01 must read the same entry
+    element_id = kwargs.get("author_id", kwargs.get("book_id"))
+    return await make_cache_key(namespace, params, element_id)
+
+
+def search_query(
+    q: Annotated[str, Query(min_length=1, max_length=settings.search.max_query_length)],
+) -> str:
+    """Normalize ``q`` so equivalent queries share one cache entry."""
+    normalized = " ".join(q.lower().split())
+    if not normalized:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+            detail="Search query is empty",
+        )
+    return normalized
+
+
+def if_match_version(
+    if_match: Annotated[str | None, Header()] = None,
+) -> int | None:
+    """Row version a PUT or PATCH expects, from an ETag made by ``entity_etag``."""
+    if if_match is None or if_match.strip() == "*":
+        return None
+    try:
+        return int(if_match.strip().removeprefix("W/").strip('"'))
+    except ValueError:
+        # Can't match any version we hand out
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="Entity was modified, fetch it again",
+        )
+
+
+def encode_cursor(last_id: int, key: Any = None) -> str:
+    """``key`` is the sort value of the last row when not sorting by id."""
+    data = {"id": last_id} if key is None else {"id": last_id, "key": key}
+    payload = json.dumps(data, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode()
+
+
+def _cursor_field(cursor: str, name: str) -> Any:
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode()))[name]
+    except (ValueError, TypeError, KeyError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+        )
+
+
+def decode_cursor(cursor: str | None) -> int | None:
+    if cursor is None:
+        return None
+    return decode_cursor_key(cursor, int, name="id")
+
+
+def decode_cursor_key(cursor: str, type_: type, name: str = "key") -> Any:
+    value = _cursor_field(cursor, name)
+    try:
+        return type_(value)
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+        )
+
+
+async def iter_csv_rows(chunks: AsyncIterable[bytes]) -> AsyncIterator[list[str]]:
+    """Parse a CSV byte stream row by row without buffering the whole body.
 
-    def clean_value(v):
-        if isinstance(v, (str, int, float, bool, type(None))):
-            return v
+    A record is emitted once it holds an even number of quotes, so quoted
+    fields with line breaks stay together even across chunk boundaries.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    record = ""
+    quotes = 0
 
-        if hasattr(v, "model_dump"):
-            return v.model_dump()
+    def split_rows(text: str, final: bool = False) -> list[list[str]]:
+        nonlocal pending, record, quotes
 
-        return f"<obj:{v.__class__.__name__}>"
+        lines = (pending + text).splitlines(keepends=True)
+        pending = ""
+        if lines and not final and not lines[-1].endswith(("\n", "\r")):
+            pending = lines.pop()
 
-    clean_kwargs = {k: clean_value(v) for k, v in kwargs.items()}
+        rows = []
+        for line in lines:
+            record += line
+            quotes += line.count('"')
+            if quotes % 2 == 0:
+                if record.strip():
+                    rows.append(next(csv.reader([record])))
+                record, quotes = "", 0
+        return rows
 
-    path_params = {k: clean_value(v) for k, v in request.path_params.items()}
+    async for chunk in chunks:
+        for row in split_rows(decoder.decode(chunk)):
+            yield row
 
-    element_id = request.path_params.get("author_id") or request.path_params.get(
-        "book_id"
-    )
-    raw_key = f"{prefix}:{namespace}:{func.__module__}:{func.__name__}:{path_params}:{clean_kwargs}"
-    hash_part = hashlib.md5(raw_key.encode()).hexdigest()
-    if element_id:
-        return f"{namespace}:{element_id}:{hash_part}"
+    for row in split_rows(decoder.decode(b"", final=True), final=True):
+        yield row
 
-    return f"{namespace}:{hash_part}"
+    if record:
+        raise ValueError("Unterminated quoted field at the end of CSV")
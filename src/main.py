@@ -1,4 +1,5 @@
-import logging.config
+import asyncio
+import logging
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, Request, status
@@ -8,14 +9,25 @@ from fastapi_cache.backends.inmemory import InMemoryBackend
 from fastapi_cache.backends.redis import RedisBackend
 from redis.asyncio import Redis
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from starlette.middleware.cors import CORSMiddleware
 
+from src.core.admission import AdmissionMiddleware
+from src.core.cache import TwoTierBackend, L1Cache, generations, make_coder
 from src.core.config import settings
+from src.core.compression import CompressionMiddleware
+from src.core.db import db_helper
+from src.core.logs import LogContextMiddleware, configure_logging
+from src.core.metrics import MetricsMiddleware, mark_dead_processes, metrics_endpoint
+from src.core.profiling import ProfilingMiddleware
+from src.core.query_log import QueryLogMiddleware
+from src.api_v1.authors.repository import AuthorsRepository
+from src.api_v1.books.repository import BooksRepository
 from src.api_v1.authors import router as authors_router
 from src.api_v1.books import router as books_router
+from src.api_v1.stats import router as stats_router
 
-
-logging.config.fileConfig("logging.ini", disable_existing_loggers=False)
+configure_logging("logging.ini", settings.logging)
 logger = logging.getLogger(__name__)
 
 
@@ -23,7 +35,7 @@ async def database_exception_handler(
     request: Request, exc: SQLAlchemyError
 ) -> JSONResponse:
     if isinstance(exc, IntegrityError):
-        logger.warning(f"Integrity error: {exc}")
+        logger.warning("Integrity error: %s", exc)
         return JSONResponse(
             status_code=status.HTTP_409_CONFLICT,
             content={"detail": "Conflict: Data already exists or constraint violation"},
@@ -36,17 +48,40 @@ async def database_exception_handler(
     )
 
 
+async def warm_up_queries(session: AsyncSession) -> None:
+    # Same statements the services run, so their SQL lands in the
+    # compiled and prepared statement caches
+    authors = AuthorsRepository(session)
+    books = BooksRepository(session)
+    for repo in (authors, books):
+        await repo.get_one(0)
+        await repo.get_page(limit=1)
+        await repo.get_page(after_id=0, limit=1)
+        await repo.get_existing_ids([0])
+    await authors.get_page(limit=1, options=authors.with_books())
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    if settings.metrics.enabled:
+        mark_dead_processes()
     redis = Redis(
         host=settings.redis.host,
         port=settings.redis.port,
         db=settings.redis.db,
         decode_responses=False,
     )
-    FastAPICache.init(
+    backend = TwoTierBackend(
         RedisBackend(redis),
+        redis=redis,
+        l1=L1Cache(**settings.cache.l1.model_dump()),
+        channel=settings.cache.invalidation_channel,
+    )
+    generations.bind(redis, settings.cache.invalidation_channel, backend.origin)
+    FastAPICache.init(
+        backend,
         prefix=settings.cache.prefix,
+        coder=make_coder(settings.cache.coder),
     )
     try:
         await redis.ping()
@@ -56,11 +91,21 @@ async def lifespan(app: FastAPI):
         await redis.set("test_startup_key", "working")
     except Exception as e:
 
-        logger.warning(f"Redis is not connected", exc_info=e)
+        logger.warning("Redis is not connected", exc_info=e)
         raise e
     logger.info("Test set complete")
+
+    if settings.db.warm_up:
+        await db_helper.warm_up(warm_up_queries)
+        logger.info("Database pool warmed up")
+
+    invalidation_listener = asyncio.create_task(backend.listen())
     yield
+    invalidation_listener.cancel()
     await redis.close()
+    await db_helper.dispose()
+    if settings.metrics.enabled:
+        mark_dead_processes(exiting=True)
 
 
 app = FastAPI(lifespan=lifespan)
@@ -73,6 +118,29 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if settings.admission.enabled:
+    app.add_middleware(
+        AdmissionMiddleware,
+        config=settings.admission,
+        pool_capacity=settings.db.pool_size + settings.db.max_overflow,
+    )
+
+if settings.compression.enabled:
+    app.add_middleware(CompressionMiddleware, config=settings.compression)
+
+app.add_middleware(LogContextMiddleware)
+
+if settings.query_log.enabled:
+    app.add_middleware(QueryLogMiddleware, config=settings.query_log)
+
+if settings.profiling.enabled or settings.profiling.sample_every:
+    app.add_middleware(ProfilingMiddleware, config=settings.profiling)
+
+if settings.metrics.enabled:
+    # Added last so it is the outermost middleware and times everything
+    app.add_middleware(MetricsMiddleware)
+    app.add_route(settings.metrics.path, metrics_endpoint, include_in_schema=False)
+
 app.add_exception_handler(SQLAlchemyError, database_exception_handler)
 
 
@@ -83,3 +151,4 @@ def root():
 
 app.include_router(books_router)
 app.include_router(authors_router)
+app.include_router(stats_router)
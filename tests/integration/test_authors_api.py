@@ -5,6 +5,8 @@ import pytest
 from httpx import AsyncClient
 
 from src.api_v1.authors.schemas import AuthorId
+from src.core.db import db_helper, PRIMARY_HEADER
+from src.core.query_log import query_budget
 
 
 @pytest.mark.parametrize(
@@ -56,3 +58,337 @@ async def test_create_authors(ac: AsyncClient, author: dict, status_code: int):
     )
 
     assert response.status_code == status_code
+
+
+async def test_get_authors_paginated(ac: AsyncClient):
+    for i in range(5):
+        response = await ac.post(
+            "/authors/",
+            json={
+                "first_name": f"Author{i}",
+                "last_name": "Test",
+                "email": f"author{i}@example.com",
+                "age": 30 + i,
+            },
+        )
+        assert response.status_code == 201
+
+    seen = []
+    cursor = None
+    while True:
+        params = {"limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        response = await ac.get("/authors/", params=params)
+        assert response.status_code == 200
+
+        page = response.json()
+        assert len(page["items"]) <= 2
+        seen.extend(AuthorId.model_validate(x).id for x in page["items"])
+
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert seen == sorted(seen)
+    assert len(seen) == 5
+
+
+async def test_get_authors_invalid_cursor(ac: AsyncClient):
+    response = await ac.get("/authors/", params={"cursor": "not-a-cursor"})
+
+    assert response.status_code == 400
+
+
+async def test_stream_authors(ac: AsyncClient):
+    for i in range(3):
+        await ac.post(
+            "/authors/",
+            json={
+                "first_name": f"Author{i}",
+                "last_name": "Stream",
+                "email": f"stream{i}@example.com",
+                "age": 40,
+            },
+        )
+
+    response = await ac.get("/authors/stream")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = response.text.splitlines()
+    assert [AuthorId.model_validate_json(x).first_name for x in lines] == [
+        "Author0",
+        "Author1",
+        "Author2",
+    ]
+
+
+async def test_create_authors_bulk(ac: AsyncClient):
+    authors = [
+        {
+            "first_name": f"Bulk{i}",
+            "last_name": "Author",
+            "email": f"bulk{i}@example.com",
+            "age": 20 + i,
+        }
+        for i in range(10)
+    ]
+
+    response = await ac.post("/authors/bulk", json=authors)
+
+    assert response.status_code == 201
+    created = [AuthorId.model_validate(x) for x in response.json()]
+    assert [x.first_name for x in created] == [x["first_name"] for x in authors]
+
+
+async def test_create_authors_bulk_validates_every_item(ac: AsyncClient):
+    authors = [
+        {"first_name": "Ok", "last_name": "Ok", "email": "ok@example.com", "age": 1},
+        {
+            "first_name": "Bad",
+            "last_name": "Bad",
+            "email": "bad@example.com",
+            "age": -1,
+        },
+    ]
+
+    response = await ac.post("/authors/bulk", json=authors)
+
+    assert response.status_code == 422
+    assert (await ac.get("/authors/")).json()["items"] == []
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        "first_name,last_name,email,age\nA,B,notanemail,-5\n",
+        "first_name,last_name,email\nA,B,a@example.com\n",
+    ],
+)
+async def test_import_authors_csv_rejects_invalid_rows(ac: AsyncClient, body: str):
+    response = await ac.post("/authors/csv", content=body.encode())
+
+    assert response.status_code == 422
+    assert (await ac.get("/authors/")).json()["items"] == []
+    assert (await ac.get("/stats/authors-per-age")).json() == []
+
+
+async def test_get_author_is_cached(ac: AsyncClient):
+    response = await ac.post(
+        "/authors/",
+        json={
+            "first_name": "Lesya",
+            "last_name": "Ukrainka",
+            "email": "lesya@example.com",
+            "age": 42,
+        },
+    )
+    author_id = response.json()["id"]
+
+    first = await ac.get(f"/authors/{author_id}", headers={"Cache-Control": "no-cache"})
+    second = await ac.get(f"/authors/{author_id}")
+
+    assert first.headers["X-FastAPI-Cache"] == "MISS"
+    assert second.headers["X-FastAPI-Cache"] == "HIT"
+    assert second.content == first.content
+
+    not_modified = await ac.get(
+        f"/authors/{author_id}", headers={"If-None-Match": second.headers["ETag"]}
+    )
+    assert not_modified.status_code == 304
+
+
+async def test_pinned_reads_bypass_cache(ac: AsyncClient, monkeypatch):
+    monkeypatch.setattr(
+        db_helper, "replica_session_factories", [db_helper.session_factory]
+    )
+    await ac.get("/authors/")
+
+    pinned = await ac.get("/authors/", headers={PRIMARY_HEADER: "1"})
+    unpinned = await ac.get("/authors/")
+
+    assert pinned.status_code == 200
+    assert "X-FastAPI-Cache" not in pinned.headers
+    assert unpinned.headers["X-FastAPI-Cache"] == "HIT"
+
+
+async def test_update_author_invalidates_cache(ac: AsyncClient):
+    author = {
+        "first_name": "Ivan",
+        "last_name": "Franko",
+        "email": "franko@example.com",
+        "age": 59,
+    }
+    author_id = (await ac.post("/authors/", json=author)).json()["id"]
+    assert (await ac.get(f"/authors/{author_id}")).json()["age"] == 59
+    assert (await ac.get("/authors/")).json()["items"][0]["age"] == 59
+
+    await ac.put(f"/authors/{author_id}", json={**author, "age": 60})
+
+    assert (await ac.get(f"/authors/{author_id}")).json()["age"] == 60
+    assert (await ac.get("/authors/")).json()["items"][0]["age"] == 60
+
+
+async def test_non_canonical_id_shares_invalidation(ac: AsyncClient):
+    author = {
+        "first_name": "Lesya",
+        "last_name": "Ukrainka",
+        "email": "ukrainka@example.com",
+        "age": 42,
+    }
+    author_id = (await ac.post("/authors/", json=author)).json()["id"]
+    padded = await ac.get(f"/authors/0{author_id}")
+    assert padded.json()["age"] == 42
+
+    await ac.patch(f"/authors/{author_id}", json={"age": 55})
+
+    response = await ac.get(f"/authors/0{author_id}")
+    assert response.json()["age"] == 55
+    assert response.headers["ETag"] != padded.headers["ETag"]
+    cached = await ac.get(
+        f"/authors/+{author_id}", headers={"If-None-Match": padded.headers["ETag"]}
+    )
+    assert cached.status_code == 200
+
+
+async def test_update_author_writes_through_cache(ac: AsyncClient):
+    author = {
+        "first_name": "Mykola",
+        "last_name": "Khvylovy",
+        "email": "khvylovy@example.com",
+        "age": 39,
+    }
+    author_id = (await ac.post("/authors/", json=author)).json()["id"]
+
+    await ac.patch(f"/authors/{author_id}", json={"bio": "Poet"})
+    response = await ac.get(f"/authors/{author_id}")
+
+    assert response.headers["X-FastAPI-Cache"] == "HIT"
+    assert response.json()["bio"] == "Poet"
+
+
+async def test_get_author_include_books(ac: AsyncClient):
+    author = {
+        "first_name": "Olha",
+        "last_name": "Kobylianska",
+        "email": "kobylianska@example.com",
+        "age": 78,
+    }
+    author_id = (await ac.post("/authors/", json=author)).json()["id"]
+
+    response = await ac.get(f"/authors/{author_id}", params={"include": "books"})
+    assert response.json()["books"] == []
+    assert "books" not in (await ac.get(f"/authors/{author_id}")).json()
+
+    book = {"title": "Zemlia", "year": 1902, "author_id": author_id}
+    book_id = (await ac.post("/books/", json=book)).json()["id"]
+
+    response = await ac.get(f"/authors/{author_id}", params={"include": "books"})
+    assert [x["id"] for x in response.json()["books"]] == [book_id]
+
+    page = (await ac.get("/authors/", params={"include": "books"})).json()
+    assert page["items"][0]["books"][0]["title"] == "Zemlia"
+
+
+async def test_update_and_delete_missing_author(ac: AsyncClient):
+    author = {
+        "first_name": "Marko",
+        "last_name": "Vovchok",
+        "email": "vovchok@example.com",
+        "age": 73,
+    }
+
+    assert (await ac.put("/authors/999999", json=author)).status_code == 404
+    assert (await ac.patch("/authors/999999", json={"age": 1})).status_code == 404
+    assert (await ac.delete("/authors/999999")).status_code == 404
+
+    author_id = (await ac.post("/authors/", json=author)).json()["id"]
+    assert (await ac.delete(f"/authors/{author_id}")).status_code == 204
+    assert (await ac.get(f"/authors/{author_id}")).status_code == 404
+
+
+async def test_search_authors(ac: AsyncClient):
+    for i, (first_name, last_name) in enumerate(
+        [("Taras", "Shevchenko"), ("Ivan", "Franko"), ("Ivan", "Kotliarevsky")]
+    ):
+        author = {
+            "first_name": first_name,
+            "last_name": last_name,
+            "email": f"author{i}@example.com",
+            "age": 40,
+        }
+        await ac.post("/authors/", json=author)
+
+    response = await ac.get("/authors/search", params={"q": "ivan fran"})
+    assert [x["last_name"] for x in response.json()["items"]] == ["Franko"]
+
+    response = await ac.get("/authors/search", params={"q": "Ivan"})
+    assert len(response.json()["items"]) == 2
+
+
+async def test_filter_and_sort_authors(ac: AsyncClient):
+    for i, (last_name, age) in enumerate(
+        [("Stus", 47), ("Antonych", 27), ("Symonenko", 28), ("Stus", 60)]
+    ):
+        author = {
+            "first_name": "Poet",
+            "last_name": last_name,
+            "email": f"poet{i}@example.com",
+            "age": age,
+        }
+        await ac.post("/authors/", json=author)
+
+    page = (await ac.get("/authors/", params={"sort": "last_name", "limit": 2})).json()
+    assert [x["last_name"] for x in page["items"]] == ["Antonych", "Stus"]
+    page = (
+        await ac.get(
+            "/authors/",
+            params={"sort": "last_name", "limit": 2, "cursor": page["next_cursor"]},
+        )
+    ).json()
+    assert [x["last_name"] for x in page["items"]] == ["Stus", "Symonenko"]
+
+    response = await ac.get("/authors/", params={"last_name": "Stus", "age_to": 50})
+    assert [x["age"] for x in response.json()["items"]] == [47]
+
+
+async def test_author_etag_follows_version(ac: AsyncClient):
+    author = {
+        "first_name": "Mykola",
+        "last_name": "Khvylovy",
+        "email": "khvylovy@example.com",
+        "age": 39,
+    }
+    author_id = (await ac.post("/authors/", json=author)).json()["id"]
+
+    fetched = await ac.get(f"/authors/{author_id}")
+    assert fetched.headers["ETag"] == '"1"'
+    assert fetched.json()["version"] == 1
+
+    # Served from the cache without a query
+    with query_budget(0):
+        not_modified = await ac.get(
+            f"/authors/{author_id}", headers={"If-None-Match": '"1"'}
+        )
+    assert not_modified.status_code == 304
+
+    updated = await ac.patch(
+        f"/authors/{author_id}", json={"age": 40}, headers={"If-Match": '"1"'}
+    )
+    assert updated.headers["ETag"] == '"2"'
+
+    # A client still holding version 1 would overwrite the age change
+    stale = await ac.put(
+        f"/authors/{author_id}", json=author, headers={"If-Match": '"1"'}
+    )
+    assert stale.status_code == 412
+
+    modified = await ac.get(f"/authors/{author_id}", headers={"If-None-Match": '"1"'})
+    assert modified.status_code == 200
+    assert modified.json()["age"] == 40
+
+    missing = await ac.patch(
+        "/authors/999999", json={"age": 1}, headers={"If-Match": '"1"'}
+    )
+    assert missing.status_code == 404
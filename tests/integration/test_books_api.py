@@ -0,0 +1,234 @@
+import pytest
+from fastapi_cache import FastAPICache
+from httpx import AsyncClient
+
+from src.api_v1.books.schemas import BookId
+from src.core.cache import make_coder
+from src.core.compression import weak_etag
+from src.core.config import settings, CacheCoderConfig
+
+
+@pytest.fixture
+async def author_id(ac: AsyncClient) -> int:
+    response = await ac.post(
+        "/authors/",
+        json={
+            "first_name": "Taras",
+            "last_name": "Shevchenko",
+            "email": "shevchenko@example.com",
+            "age": 47,
+        },
+    )
+    return response.json()["id"]
+
+
+async def test_create_books_bulk(ac: AsyncClient, author_id: int):
+    books = [
+        {"title": f"Book {i}", "year": 1840 + i, "author_id": author_id}
+        for i in range(10)
+    ]
+
+    response = await ac.post("/books/bulk", json=books)
+
+    assert response.status_code == 201
+    created = [BookId.model_validate(x) for x in response.json()]
+    assert [x.title for x in created] == [x["title"] for x in books]
+
+
+async def test_create_books_bulk_unknown_author(ac: AsyncClient, author_id: int):
+    books = [
+        {"title": "Kobzar", "year": 1840, "author_id": author_id},
+        {"title": "Orphan", "year": 1841, "author_id": author_id + 100},
+    ]
+
+    response = await ac.post("/books/bulk", json=books)
+
+    assert response.status_code == 404
+    assert (await ac.get("/books/")).json()["items"] == []
+
+
+async def test_books_csv_round_trip(ac: AsyncClient, author_id: int):
+    body = (
+        "title,year,author_id\n"
+        f'"Kobzar, first edition",1840,{author_id}\n'
+        f"Haidamaky,1841,{author_id}\n"
+    )
+
+    response = await ac.post("/books/csv", content=body.encode())
+
+    assert response.status_code == 201
+    assert response.json() == {"imported": 2}
+
+    response = await ac.get("/books/csv")
+
+    assert response.status_code == 200
+    lines = response.text.splitlines()
+    assert lines[0] == "title,year,author_id,id"
+    assert lines[1] == f'"Kobzar, first edition",1840,{author_id},1'
+
+
+async def test_books_csv_import_unknown_author(ac: AsyncClient, author_id: int):
+    body = f"title,year,author_id\nKobzar,1840,{author_id}\nLost,1841,999\n"
+
+    response = await ac.post("/books/csv", content=body.encode())
+
+    assert response.status_code == 404
+    assert (await ac.get("/books/")).json()["items"] == []
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        "title,year,author_id\nKobzar,not-a-year,{author_id}\n",
+        "title,year,author_id\n,1840,{author_id}\n",
+        "title,year\nKobzar,1840\n",
+    ],
+)
+async def test_books_csv_import_invalid_row(ac: AsyncClient, author_id: int, body: str):
+    response = await ac.post(
+        "/books/csv", content=body.format(author_id=author_id).encode()
+    )
+
+    assert response.status_code == 422
+
+
+async def test_search_books(ac: AsyncClient, author_id: int):
+    titles = ["Kobzar", "Kateryna", "Haidamaky", "Kobzar Illustrated"]
+    await ac.post(
+        "/books/bulk",
+        json=[{"title": x, "year": 1840, "author_id": author_id} for x in titles],
+    )
+
+    response = await ac.get("/books/search", params={"q": "kobz", "limit": 1})
+    page = response.json()
+    assert [x["title"] for x in page["items"]] == ["Kobzar"]
+
+    response = await ac.get(
+        "/books/search",
+        params={"q": "  KOBZ ", "limit": 1, "cursor": page["next_cursor"]},
+    )
+    assert [x["title"] for x in response.json()["items"]] == ["Kobzar Illustrated"]
+    assert response.json()["next_cursor"] is None
+
+    cached = await ac.get("/books/search", params={"q": "Kobz  ", "limit": 1})
+    assert cached.headers["X-FastAPI-Cache"] == "HIT"
+
+    assert (await ac.get("/books/search", params={"q": "   "})).status_code == 422
+
+
+async def test_search_books_tolerates_typos(ac: AsyncClient, author_id: int):
+    if not settings.search.fuzzy:
+        pytest.skip("pg_trgm is not available")
+
+    book = {"title": "Haidamaky", "year": 1841, "author_id": author_id}
+    await ac.post("/books/", json=book)
+
+    response = await ac.get("/books/search", params={"q": "haidamki"})
+    assert [x["title"] for x in response.json()["items"]] == ["Haidamaky"]
+
+
+async def test_filter_and_sort_books(ac: AsyncClient, author_id: int):
+    other = {
+        "first_name": "Lina",
+        "last_name": "Kostenko",
+        "email": "kostenko@example.com",
+        "age": 95,
+    }
+    other_id = (await ac.post("/authors/", json=other)).json()["id"]
+    books = [
+        {"title": f"Book {year}", "year": year, "author_id": author_id}
+        for year in (1838, 1845, 1840, 1860)
+    ]
+    books.append({"title": "Marusia Churai", "year": 1979, "author_id": other_id})
+    await ac.post("/books/bulk", json=books)
+
+    params = {"author_id": author_id, "year_from": 1839, "sort": "-year", "limit": 1}
+    years = []
+    cursor = None
+    while True:
+        query = params if cursor is None else {**params, "cursor": cursor}
+        page = (await ac.get("/books/", params=query)).json()
+        years += [x["year"] for x in page["items"]]
+        if (cursor := page["next_cursor"]) is None:
+            break
+    assert years == [1860, 1845, 1840]
+
+    first = await ac.get("/books/?year_to=1900&author_id=%s" % author_id)
+    second = await ac.get("/books/?author_id=%s&year_to=1900" % author_id)
+    assert len(first.json()["items"]) == 4
+    assert second.headers["X-FastAPI-Cache"] == "HIT"
+
+    assert (await ac.get("/books/", params={"sort": "title"})).status_code == 422
+
+
+async def test_book_if_match(ac: AsyncClient, author_id: int):
+    book = {"title": "Kobzar", "year": 1840, "author_id": author_id}
+    book_id = (await ac.post("/books/", json=book)).json()["id"]
+    etag = (await ac.get(f"/books/{book_id}")).headers["ETag"]
+
+    first = await ac.patch(
+        f"/books/{book_id}", json={"year": 1860}, headers={"If-Match": etag}
+    )
+    second = await ac.patch(
+        f"/books/{book_id}", json={"year": 1844}, headers={"If-Match": etag}
+    )
+
+    assert first.status_code == 200
+    assert second.status_code == 412
+    assert (await ac.get(f"/books/{book_id}")).json()["year"] == 1860
+    assert (await ac.get("/stats/books-per-year")).json() == [
+        {"year": 1860, "books": 1}
+    ]
+
+    listed = await ac.get("/books/")
+    cached = await ac.get("/books/", headers={"If-None-Match": listed.headers["ETag"]})
+    assert cached.status_code == 304
+
+
+async def test_cached_list_compressed(ac: AsyncClient, author_id: int):
+    books = [
+        {"title": f"Book {i}", "year": 1840 + i, "author_id": author_id}
+        for i in range(50)
+    ]
+    await ac.post("/books/bulk", json=books)
+
+    headers = {"Accept-Encoding": "br"}
+    first = await ac.get("/books/", params={"limit": 50}, headers=headers)
+    second = await ac.get("/books/", params={"limit": 50}, headers=headers)
+    plain = await ac.get(
+        "/books/", params={"limit": 50}, headers={"Accept-Encoding": "identity"}
+    )
+
+    assert second.headers["X-FastAPI-Cache"] == "HIT"
+    assert first.headers["Content-Encoding"] == "br"
+    assert second.headers["Content-Encoding"] == "br"
+    assert second.headers["ETag"] == weak_etag(plain.headers["ETag"])
+    assert "Content-Encoding" not in plain.headers
+    assert first.json() == second.json() == plain.json()
+
+    cached = await ac.get(
+        "/books/",
+        params={"limit": 50},
+        headers={**headers, "If-None-Match": second.headers["ETag"]},
+    )
+    assert cached.status_code == 304
+
+
+async def test_compact_cache_coder(ac: AsyncClient, author_id: int, monkeypatch):
+    config = CacheCoderConfig(format="msgpack", zstd={"enabled": True})
+    monkeypatch.setattr(FastAPICache, "_coder", make_coder(config))
+    books = [
+        {"title": f"Book {i}", "year": 1840 + i, "author_id": author_id}
+        for i in range(100)
+    ]
+    await ac.post("/books/bulk", json=books)
+
+    first = await ac.get("/books/", params={"limit": 100})
+    second = await ac.get("/books/", params={"limit": 100})
+    plain = await ac.get(
+        "/books/", params={"limit": 100}, headers={"Accept-Encoding": "identity"}
+    )
+
+    assert second.headers["X-FastAPI-Cache"] == "HIT"
+    assert first.json() == second.json() == plain.json()
+    assert len(plain.json()["items"]) == 100
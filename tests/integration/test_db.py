@@ -0,0 +1,32 @@
+from src.core.db import DataBaseHelper
+from src.core.metrics import DB_POOL_CHECKED_OUT, DB_POOL_WAIT, DB_QUERY_DURATION
+from src.main import warm_up_queries
+from tests.conftest import TEST_DATABASE_URL
+
+
+async def test_warm_up_opens_pool(db_session):
+    helper = DataBaseHelper(url=TEST_DATABASE_URL, echo=False, pool_size=3)
+
+    await helper.warm_up(warm_up_queries)
+
+    assert helper.engine.pool.checkedin() == 3
+    assert helper.engine.pool.checkedout() == 0
+    await helper.engine.dispose()
+
+
+async def test_engine_metrics(db_session):
+    helper = DataBaseHelper(
+        url=TEST_DATABASE_URL, echo=False, pool_size=2, metrics=True
+    )
+
+    await helper.warm_up(warm_up_queries)
+
+    samples = {
+        (x.name, tuple(x.labels.values())): x.value
+        for metric in (DB_QUERY_DURATION, DB_POOL_CHECKED_OUT, DB_POOL_WAIT)
+        for x in metric.collect()[0].samples
+    }
+    assert samples[("db_query_duration_seconds_count", ("primary", "SELECT"))] > 0
+    assert samples[("db_pool_wait_seconds_count", ("primary",))] >= 2
+    assert samples[("db_pool_checked_out", ("primary",))] == 0
+    await helper.dispose()
@@ -0,0 +1,51 @@
+import os
+import subprocess
+import sys
+
+from httpx import AsyncClient
+
+from src.core.metrics import mark_dead_processes
+
+
+async def test_metrics_endpoint(ac: AsyncClient):
+    author = {
+        "first_name": "Vasyl",
+        "last_name": "Stus",
+        "email": "stus@example.com",
+        "age": 47,
+    }
+    author_id = (await ac.post("/authors/", json=author)).json()["id"]
+    await ac.get(f"/authors/{author_id}")
+
+    response = await ac.get("/metrics")
+
+    assert response.status_code == 200
+    body = response.text
+    assert (
+        'http_request_duration_seconds_count{method="GET",'
+        'route="/authors/{author_id}",status="200"}'
+    ) in body
+    assert 'cache_requests_total{namespace="author",result="hit"}' in body
+    assert 'cache_invalidations_total{namespace="authors_list"}' in body
+
+
+def test_dead_workers_leave_the_gauges(tmp_path, monkeypatch):
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+    dead = subprocess.run(
+        [sys.executable, "-c", "import os; print(os.getpid())"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    dead_pid, own_pid = int(dead.stdout), os.getpid()
+    for pid in (dead_pid, own_pid):
+        (tmp_path / f"gauge_livesum_{pid}.db").touch()
+        (tmp_path / f"counter_{pid}.db").touch()
+
+    mark_dead_processes()
+    assert not (tmp_path / f"gauge_livesum_{dead_pid}.db").exists()
+    assert (tmp_path / f"gauge_livesum_{own_pid}.db").exists()
+
+    mark_dead_processes(exiting=True)
+    assert not (tmp_path / f"gauge_livesum_{own_pid}.db").exists()
+    assert (tmp_path / f"counter_{own_pid}.db").exists()
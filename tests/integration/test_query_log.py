@@ -0,0 +1,88 @@
+import logging
+
+import pytest
+from fastapi import Depends, FastAPI
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+
+from src.core.config import QueryLogConfig
+from src.core.query_log import (
+    QueryBudgetExceeded,
+    QueryLogMiddleware,
+    query_budget,
+    redact,
+    statement_shape,
+)
+from src.core.timing import observe_statements
+from tests.conftest import TEST_DATABASE_URL, TestingSessionLocal
+
+
+def test_statement_shape_and_redaction():
+    statement = "SELECT *\n  FROM books WHERE id IN ($1::INTEGER, $2::INTEGER) LIMIT $3"
+
+    assert statement_shape(statement) == "SELECT * FROM books WHERE id IN (?) LIMIT ?"
+    assert redact(("secret@example.com", 7)) == "('str', 'int')"
+    assert redact([(1,), (2,)], executemany=True) == "<2 rows>"
+
+
+async def test_query_budget(ac: AsyncClient):
+    author = {
+        "first_name": "Alexander",
+        "last_name": "Pushkin",
+        "email": "pushkin@example.com",
+        "age": 35,
+    }
+    author_id = (await ac.post("/authors/", json=author)).json()["id"]
+
+    # Written through to the cache on create
+    with query_budget(0):
+        assert (await ac.get(f"/authors/{author_id}")).status_code == 200
+
+    with pytest.raises(QueryBudgetExceeded, match="1 statements executed"):
+        with query_budget(0):
+            await ac.get("/authors/")
+
+
+async def test_repeated_statements_reported(db_session, caplog, monkeypatch):
+    # logging.ini stops "src" loggers from reaching caplog's root handler
+    monkeypatch.setattr(logging.getLogger("src"), "propagate", True)
+
+    app = FastAPI()
+
+    async def session():
+        async with TestingSessionLocal() as s:
+            yield s
+
+    @app.get("/items/{count}")
+    async def items(count: int, s=Depends(session)):
+        for i in range(count):
+            await s.execute(text("SELECT CAST(:i AS integer)"), {"i": i})
+        return {}
+
+    app.add_middleware(QueryLogMiddleware, config=QueryLogConfig(repeat_threshold=3))
+
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        with caplog.at_level(logging.WARNING, logger="src.core.query_log"):
+            await client.get("/items/3")
+            assert "N+1" not in caplog.text
+            await client.get("/items/4")
+
+    assert "Possible N+1 on GET /items/{count}: statement ran 4 times" in caplog.text
+
+
+async def test_statements_are_timed_once_for_all_observers():
+    engine = create_async_engine(TEST_DATABASE_URL, poolclass=NullPool)
+    first, second = [], []
+    observe_statements(engine, lambda *args: first.append(args[-1]))
+    observe_statements(engine, lambda *args: second.append(args[-1]))
+
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+    await engine.dispose()
+
+    assert len(engine.sync_engine.dispatch.before_cursor_execute) == 1
+    assert first == second and len(first) >= 1
@@ -0,0 +1,73 @@
+from httpx import AsyncClient
+
+
+async def create_author(ac: AsyncClient, name: str, age: int) -> int:
+    author = {
+        "first_name": name,
+        "last_name": name,
+        "email": f"{name.lower()}@example.com",
+        "age": age,
+    }
+    return (await ac.post("/authors/", json=author)).json()["id"]
+
+
+async def test_stats_follow_writes(ac: AsyncClient):
+    first = await create_author(ac, "Taras", 47)
+    second = await create_author(ac, "Lesya", 42)
+    await ac.post(
+        "/books/bulk",
+        json=[
+            {"title": "Kobzar", "year": 1840, "author_id": first},
+            {"title": "Haidamaky", "year": 1841, "author_id": first},
+            {"title": "Lisova pisnia", "year": 1911, "author_id": second},
+        ],
+    )
+    book_id = (
+        await ac.post(
+            "/books/", json={"title": "Draft", "year": 1840, "author_id": second}
+        )
+    ).json()["id"]
+
+    assert (await ac.get("/stats/totals")).json() == {"authors": 2, "books": 4}
+    assert (await ac.get("/stats/books-per-author")).json() == [
+        {"author_id": first, "books": 2},
+        {"author_id": second, "books": 2},
+    ]
+
+    await ac.patch(f"/books/{book_id}", json={"author_id": first, "year": 1911})
+    await ac.patch(f"/authors/{second}", json={"age": 47})
+
+    assert (await ac.get("/stats/books-per-author")).json() == [
+        {"author_id": first, "books": 3},
+        {"author_id": second, "books": 1},
+    ]
+    assert (await ac.get("/stats/books-per-year")).json() == [
+        {"year": 1840, "books": 1},
+        {"year": 1841, "books": 1},
+        {"year": 1911, "books": 2},
+    ]
+    assert (await ac.get("/stats/authors-per-age")).json() == [
+        {"age": 47, "authors": 2}
+    ]
+
+    await ac.delete(f"/authors/{first}")
+
+    assert (await ac.get("/stats/totals")).json() == {"authors": 1, "books": 1}
+    assert (await ac.get("/stats/books-per-year")).json() == [
+        {"year": 1911, "books": 1}
+    ]
+
+
+async def test_stats_follow_csv_import(ac: AsyncClient):
+    author_id = await create_author(ac, "Ivan", 59)
+    body = f"title,year,author_id\nZakhar Berkut,1883,{author_id}\nMoisei,1905,{author_id}\n"
+
+    response = await ac.post("/books/csv", content=body)
+    assert response.status_code == 201
+
+    assert (await ac.get("/stats/books-per-author")).json() == [
+        {"author_id": author_id, "books": 2}
+    ]
+
+    await ac.delete("/books/")
+    assert (await ac.get("/stats/totals")).json() == {"authors": 1, "books": 0}
@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+from fastapi import Depends, FastAPI, Request
+from httpx import AsyncClient, ASGITransport
+
+from src.core.admission import AdmissionMiddleware, Limiter, Overloaded, admit
+from src.core.cache import cache
+from src.core.config import AdmissionConfig
+from src.core.utils import custom_key_builder
+
+
+async def test_limiter_queues_then_sheds():
+    limiter = Limiter(limit=1, queue_size=1)
+    await limiter.acquire(timeout=1)
+
+    waiting = asyncio.create_task(limiter.acquire(timeout=1))
+    await asyncio.sleep(0)
+    with pytest.raises(Overloaded, match="queue full"):
+        await limiter.acquire(timeout=1)
+
+    limiter.release()
+    await waiting
+    assert limiter.active == 1
+
+    with pytest.raises(Overloaded, match="timed out"):
+        await limiter.acquire(timeout=0.01)
+    limiter.release()
+    assert limiter.active == 0
+
+
+def make_app(config: AdmissionConfig) -> tuple[FastAPI, asyncio.Event]:
+    app = FastAPI()
+    release = asyncio.Event()
+
+    async def database(request: Request) -> None:
+        await admit(request)
+
+    @app.get("/slow", dependencies=[Depends(database)])
+    async def slow():
+        await release.wait()
+        return {"ok": True}
+
+    @app.get("/export", dependencies=[Depends(database)])
+    async def export():
+        await release.wait()
+        return {"ok": True}
+
+    @app.get("/cached", dependencies=[Depends(database)])
+    @cache(namespace="admission_test", expire=60, key_builder=custom_key_builder)
+    async def cached():
+        return {"ok": True}
+
+    app.add_middleware(AdmissionMiddleware, config=config, pool_capacity=2)
+    return app, release
+
+
+async def test_sheds_when_saturated_but_serves_cache_hits():
+    config = AdmissionConfig(
+        queue_size=0, timeout=0.05, route_limits={"GET /export": 1}, retry_after=3
+    )
+    app, release = make_app(config)
+    transport = ASGITransport(app=app)
+
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        assert (await ac.get("/cached")).status_code == 200
+
+        export = asyncio.create_task(ac.get("/export"))
+        await asyncio.sleep(0.01)
+        busy_route = await ac.get("/export")
+
+        slow = asyncio.create_task(ac.get("/slow"))
+        await asyncio.sleep(0.01)
+        busy_db = await ac.get("/slow")
+        hit = await ac.get("/cached")
+
+        release.set()
+        assert (await export).status_code == 200
+        assert (await slow).status_code == 200
+        after = await ac.get("/slow")
+
+    assert busy_route.status_code == 429
+    assert busy_db.status_code == 503
+    assert busy_db.headers["Retry-After"] == "3"
+    assert hit.status_code == 200
+    assert hit.headers["X-FastAPI-Cache"] == "HIT"
+    assert after.status_code == 200
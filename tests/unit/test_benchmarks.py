@@ -0,0 +1,67 @@
+from benchmarks.coders import CODERS, format_report, measure
+from benchmarks.runner import Samples, compare
+from benchmarks.scenarios import READ_ROUTES
+from benchmarks.seed import Dataset
+from src.core.cache import make_coder
+
+
+def test_samples_summary():
+    samples = Samples(latencies=[x / 1000 for x in range(1, 101)], errors=2, elapsed=2)
+
+    summary = samples.summary()
+
+    assert summary["requests"] == 100
+    assert summary["errors"] == 2
+    assert summary["p50_ms"] == 50.5
+    assert summary["p99_ms"] == 99.01
+    assert summary["rps"] == 50
+
+
+def test_cold_keys_are_distinct_requests():
+    dataset = Dataset(books=1000, authors=100)
+
+    for route in READ_ROUTES:
+        keys = min(route.keys(dataset), 50)
+        calls = {repr(route.call(dataset, k)) for k in range(keys)}
+        assert len(calls) == keys, route.name
+
+
+def test_compare():
+    old = {
+        "results": [
+            {
+                "mix": "warm",
+                "route": "GET /",
+                "p50_ms": 2.0,
+                "p99_ms": 4.0,
+                "rps": 100.0,
+            }
+        ]
+    }
+    new = {
+        "results": [
+            {
+                "mix": "warm",
+                "route": "GET /",
+                "p50_ms": 1.0,
+                "p99_ms": 4.0,
+                "rps": 150.0,
+            }
+        ]
+    }
+
+    assert "1.0 (-50%)" in compare(old, new)
+    assert "150.0 (+50%)" in compare(old, new)
+
+
+def test_coder_report_relative_to_first_coder():
+    body = b'{"items": [' + b",".join(b'{"id": 1}' for _ in range(100)) + b"]}"
+    results = [
+        {"body": "GET /books/", "coder": name, **measure(make_coder(config), body, 1)}
+        for name, config in CODERS.items()
+    ]
+
+    lines = format_report(results).splitlines()
+    assert results[0]["bytes"] == len(body)
+    assert "100%" in lines[1]
+    assert len(lines) == 1 + len(CODERS)
@@ -0,0 +1,227 @@
+import asyncio
+import time
+
+import orjson
+import pytest
+from fakeredis import FakeAsyncRedis, FakeServer
+from fastapi_cache.backends.redis import RedisBackend
+
+from src.core.cache import (
+    L1Cache,
+    SingleFlight,
+    TwoTierBackend,
+    CacheGenerations,
+    ZSTD_MAGIC,
+    etag_matches,
+    make_coder,
+    peer_lock,
+)
+from src.core.config import CacheCoderConfig
+from src.core.responses import JSONBytesResponse
+
+
+def test_l1_cache_evicts_least_recently_used():
+    l1 = L1Cache(max_entries=2, max_bytes=1024, ttl=60)
+    l1.set("a", b"1")
+    l1.set("b", b"2")
+    l1.get("a")
+
+    l1.set("c", b"3")
+
+    assert l1.get("b") is None
+    assert l1.get("a")[1] == b"1"
+    assert l1.get("c") is not None
+
+
+def test_l1_cache_is_bounded_by_bytes():
+    l1 = L1Cache(max_entries=100, max_bytes=9, ttl=60)
+    l1.set("a", b"1234")
+    l1.set("b", b"1234")
+
+    assert l1.get("a") is None
+    assert l1.size == 5
+
+    l1.set("big", b"x" * 100)
+    assert l1.get("big") is None
+
+
+def test_l1_cache_expires_entries(monkeypatch):
+    l1 = L1Cache(max_entries=10, max_bytes=1024, ttl=60)
+    l1.set("a", b"1", expire=5)
+
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + 6)
+
+    assert l1.get("a") is None
+    assert l1.size == 0
+
+
+def test_l1_cache_drops_namespace():
+    l1 = L1Cache(max_entries=10, max_bytes=1024, ttl=60)
+    l1.set("cache:books_list:1", b"1")
+    l1.set("cache:book:1:abc", b"2")
+
+    l1.drop_namespace("cache:books_list")
+
+    assert l1.get("cache:books_list:1") is None
+    assert l1.get("cache:book:1:abc") is not None
+
+
+async def test_single_flight_runs_once_per_key():
+    single_flight = SingleFlight()
+    calls = 0
+
+    async def load():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return calls
+
+    results = await asyncio.gather(*(single_flight.do("k", load) for _ in range(10)))
+
+    assert calls == 1
+    assert results == [1] * 10
+
+
+async def test_single_flight_shares_exceptions():
+    single_flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise LookupError("missing")
+
+    results = await asyncio.gather(
+        *(single_flight.do("k", fail) for _ in range(3)), return_exceptions=True
+    )
+
+    assert all(isinstance(x, LookupError) for x in results)
+    with pytest.raises(LookupError):
+        await single_flight.do("k", fail)
+
+
+async def test_generations_bump_changes_generation():
+    generations = CacheGenerations()
+
+    assert await generations.get("cache:books_list") == 0
+
+    await generations.bump("cache:books_list", "cache:book:1")
+
+    assert await generations.get("cache:books_list") == 1
+    assert await generations.get("cache:book:1") == 1
+    assert await generations.get("cache:book:2") == 0
+
+
+def test_etag_matches_weakly():
+    assert etag_matches('"3"', '"3"')
+    assert etag_matches('W/"3"', '"3"')
+    assert etag_matches('"1", W/"3"', '"3"')
+    assert etag_matches("*", '"3"')
+    assert not etag_matches('"2"', '"3"')
+
+
+@pytest.mark.parametrize("format_", ["orjson", "msgpack"])
+@pytest.mark.parametrize("zstd", [False, True])
+def test_coders_round_trip(format_: str, zstd: bool):
+    config = CacheCoderConfig(
+        format=format_, zstd={"enabled": zstd, "minimum_size": 100}
+    )
+    coder = make_coder(config)
+    small = {"id": 1, "title": "Kobzar"}
+    large = {"items": [{"id": i, "title": "Kobzar"} for i in range(50)]}
+
+    for value in (small, large):
+        stored = coder.encode(JSONBytesResponse(orjson.dumps(value)))
+        assert stored.startswith(ZSTD_MAGIC) == (zstd and value is large)
+        assert coder.decode(stored) == value
+        assert orjson.loads(coder.decode_as_type(stored, type_=None).body) == value
+
+
+async def test_peer_lock_keeps_a_lock_it_no_longer_owns():
+    redis = FakeAsyncRedis()
+    backend = RedisBackend(redis)
+
+    async with peer_lock(backend, "cache:books_list") as value:
+        assert value is None
+        # Our lock expired and another worker acquired its own
+        await redis.set("cache:books_list:lock", "other")
+    assert await redis.get("cache:books_list:lock") == b"other"
+
+    async with peer_lock(backend, "cache:book:1"):
+        assert await redis.exists("cache:book:1:lock")
+    assert not await redis.exists("cache:book:1:lock")
+
+
+def make_worker(server: FakeServer) -> TwoTierBackend:
+    redis = FakeAsyncRedis(server=server)
+    return TwoTierBackend(
+        RedisBackend(redis),
+        redis=redis,
+        l1=L1Cache(max_entries=10, max_bytes=1000, ttl=60),
+        channel="cache:invalidate",
+    )
+
+
+async def wait_for(condition, timeout: float = 2.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not await condition():
+        assert time.monotonic() < deadline, "condition not met in time"
+        await asyncio.sleep(0.01)
+
+
+async def test_invalidation_evicts_l1_entries_of_other_workers():
+    server = FakeServer()
+    first, second = make_worker(server), make_worker(server)
+    listener = asyncio.create_task(second.listen(retry_delay=0.01))
+
+    async def subscribed() -> bool:
+        return (
+            dict(await first.redis.pubsub_numsub(first.channel)).get(
+                first.channel.encode(), 0
+            )
+            > 0
+        )
+
+    try:
+        await wait_for(subscribed)
+        await first.set("cache:book:1:0:abc", b"Kobzar", 60)
+        assert await second.get("cache:book:1:0:abc") == b"Kobzar"
+        assert second.l1.get("cache:book:1:0:abc") is not None
+
+        await first.clear(key="cache:book:1:0:abc")
+
+        async def evicted() -> bool:
+            return second.l1.get("cache:book:1:0:abc") is None
+
+        await wait_for(evicted)
+        assert await second.get("cache:book:1:0:abc") is None
+    finally:
+        listener.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await listener
+
+
+async def test_listener_flushes_l1_when_it_reconnects():
+    worker = make_worker(FakeServer())
+    worker.l1.set("cache:book:1:0:abc", b"Kobzar", 60)
+    pubsub = worker.redis.pubsub
+    attempts = []
+
+    def flaky_pubsub(**kwargs):
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ConnectionError("Redis went away")
+        return pubsub(**kwargs)
+
+    worker.redis.pubsub = flaky_pubsub
+    listener = asyncio.create_task(worker.listen(retry_delay=0.01))
+
+    async def reconnected() -> bool:
+        return len(attempts) > 1
+
+    try:
+        await wait_for(reconnected)
+        assert worker.l1.get("cache:book:1:0:abc") is None
+    finally:
+        listener.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await listener
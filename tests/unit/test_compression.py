@@ -0,0 +1,68 @@
+import brotli
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from httpx import AsyncClient, ASGITransport
+
+from src.core.compression import CompressionMiddleware, negotiate
+from src.core.config import CompressionConfig
+
+
+def make_client() -> AsyncClient:
+    app = FastAPI()
+
+    @app.get("/items")
+    async def items(count: int):
+        return [{"id": i, "title": "Kobzar"} for i in range(count)]
+
+    @app.get("/stream")
+    async def stream():
+        async def rows():
+            for i in range(100):
+                yield b'{"id": %d}\n' % i
+
+        return StreamingResponse(rows(), media_type="application/x-ndjson")
+
+    app.add_middleware(CompressionMiddleware, config=CompressionConfig())
+    return AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+
+
+def test_negotiate():
+    assert negotiate("gzip, deflate, br") == "br"
+    assert negotiate("gzip;q=0.5, br;q=0") == "gzip"
+    assert negotiate("*") == "br"
+    assert negotiate("identity") is None
+    assert negotiate(None) is None
+
+
+async def test_large_bodies_compressed():
+    async with make_client() as ac:
+        small = await ac.get("/items?count=1", headers={"Accept-Encoding": "gzip"})
+        large = await ac.get("/items?count=100", headers={"Accept-Encoding": "gzip"})
+        br = await ac.get("/items?count=100", headers={"Accept-Encoding": "br"})
+        plain = await ac.get(
+            "/items?count=100", headers={"Accept-Encoding": "identity"}
+        )
+
+    assert "Content-Encoding" not in small.headers
+    assert large.headers["Content-Encoding"] == "gzip"
+    assert br.headers["Content-Encoding"] == "br"
+    assert "Content-Encoding" not in plain.headers
+    assert large.json() == br.json() == plain.json()
+    assert int(large.headers["Content-Length"]) < len(plain.content)
+    assert plain.headers["Vary"] == "Accept-Encoding"
+
+
+async def test_streams_compressed_chunk_by_chunk():
+    async with make_client() as ac:
+        async with ac.stream(
+            "GET", "/stream", headers={"Accept-Encoding": "br"}
+        ) as response:
+            raw = b"".join([x async for x in response.aiter_raw()])
+
+    assert response.headers["Content-Encoding"] == "br"
+    lines = brotli.decompress(raw).splitlines()
+    assert len(lines) == 100
+
+    async with make_client() as ac:
+        response = await ac.get("/stream", headers={"Accept-Encoding": "gzip"})
+    assert len(response.text.splitlines()) == 100
@@ -0,0 +1,82 @@
+import json
+import logging
+import queue
+import threading
+
+from fastapi import FastAPI
+from httpx import AsyncClient, ASGITransport
+
+from src.core.config import LoggingConfig
+from src.core.logs import (
+    JSONFormatter,
+    LogContextMiddleware,
+    RouteSampler,
+    RoutingQueueHandler,
+    RoutingQueueListener,
+)
+
+
+class ListHandler(logging.Handler):
+    def __init__(self, level=logging.NOTSET):
+        super().__init__(level)
+        self.records = []
+        self.threads = set()
+
+    def emit(self, record):
+        self.records.append(self.format(record))
+        self.threads.add(threading.current_thread().name)
+
+
+def test_records_written_by_listener_thread():
+    q = queue.SimpleQueue()
+    everything, warnings = ListHandler(), ListHandler(logging.WARNING)
+    logger = logging.getLogger("tests.queue")
+    logger.propagate = False
+    logger.handlers = [RoutingQueueHandler(q, [everything, warnings])]
+    listener = RoutingQueueListener(q)
+    listener.start()
+
+    logger.warning("Book %s is gone", 42)
+    logger.info("Get book %s", 7)
+    listener.stop()
+
+    assert everything.records == ["Book 42 is gone", "Get book 7"]
+    assert warnings.records == ["Book 42 is gone"]
+    assert threading.current_thread().name not in everything.threads
+
+
+async def test_info_records_sampled_per_route():
+    config = LoggingConfig(sample_rates={"GET /items/{item_id}": 0})
+    handler = ListHandler()
+    handler.addFilter(RouteSampler(config))
+    handler.setFormatter(JSONFormatter())
+    logger = logging.getLogger("tests.sampled")
+    logger.propagate = False
+    logger.handlers = [handler]
+
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: int):
+        logger.info("Get item %s", item_id)
+        logger.warning("Item %s is low", item_id)
+
+    @app.get("/other")
+    async def other():
+        logger.info("Other")
+
+    app.add_middleware(LogContextMiddleware)
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as ac:
+        await ac.get("/items/1")
+        await ac.get("/other")
+    logger.info("Outside of a request")
+
+    records = [json.loads(x) for x in handler.records]
+    assert [(x["message"], x.get("route")) for x in records] == [
+        ("Item 1 is low", "GET /items/{item_id}"),
+        ("Other", "GET /other"),
+        ("Outside of a request", None),
+    ]
+    assert records[0]["level"] == "WARNING"
@@ -0,0 +1,43 @@
+import json
+
+from fastapi import FastAPI
+from httpx import AsyncClient, ASGITransport
+
+from src.core.config import ProfilingConfig
+from src.core.profiling import ProfilingMiddleware
+
+
+def make_client(config: ProfilingConfig) -> AsyncClient:
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: int):
+        return {"id": item_id}
+
+    app.add_middleware(ProfilingMiddleware, config=config)
+    return AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+
+
+async def test_profile_returned_for_header(tmp_path):
+    config = ProfilingConfig(enabled=True, token="secret", directory=tmp_path)
+
+    async with make_client(config) as ac:
+        plain = await ac.get("/items/1")
+        wrong_token = await ac.get("/items/1", headers={"X-Profile": "nope"})
+        profiled = await ac.get("/items/1", headers={"X-Profile": "secret"})
+
+    assert plain.json() == wrong_token.json() == {"id": 1}
+    assert "speedscope" in profiled.json()["$schema"]
+
+
+async def test_sampled_profiles_rotate(tmp_path):
+    config = ProfilingConfig(sample_every=2, max_files=2, directory=tmp_path)
+
+    async with make_client(config) as ac:
+        for i in range(8):
+            assert (await ac.get(f"/items/{i}")).json() == {"id": i}
+
+    files = sorted(tmp_path.iterdir())
+    assert len(files) == 2
+    assert files[0].name.endswith("-GET_items_item_id.speedscope.json")
+    json.loads(files[0].read_text())